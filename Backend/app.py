@@ -1,16 +1,41 @@
 import os
+import base64
+import hashlib
+import json
 import yaml
 import logging
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Optional
 import sqlite3
 import boto3
-from kubernetes import client, config
+from kubernetes import client, config, watch
 import subprocess
 import time
-import subprocess
+import ssl
+import urllib3
+from urllib.parse import parse_qs
+import threading
+import socket
+import random
+import uuid
+import asyncio
+import functools
+import contextlib
+import contextvars
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict, deque
 from kubernetes.client import CustomObjectsApi
+from kubernetes.utils.quantity import parse_quantity
+from aiokafka import AIOKafkaConsumer, AIOKafkaProducer, TopicPartition
+from aiokafka.admin import AIOKafkaAdminClient, NewTopic
+from aiokafka.errors import for_code
+import keda_simulator
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
 
 
 
@@ -25,48 +50,452 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Profile"],
+)
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "kedaapp_http_request_duration_seconds", "Time until response headers are sent", ["method", "route", "status"]
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge("kedaapp_http_requests_in_flight", "Requests being handled, streams included", ["method"])
+KUBECONFIG_BUILD_SECONDS = Histogram(
+    "kedaapp_kubeconfig_build_seconds", "Kubeconfig builds, in memory (client) or written for kubectl/helm (file)", ["cluster", "target"]
 )
+EKS_DESCRIBE_CLUSTER_SECONDS = Histogram("kedaapp_eks_describe_cluster_seconds", "EKS describe_cluster calls", ["cluster"])
+SUBPROCESS_SECONDS = Histogram(
+    "kedaapp_subprocess_duration_seconds", "kubectl/helm runs", ["cluster", "command", "status"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+KUBE_API_SECONDS = Histogram(
+    "kedaapp_kube_api_request_duration_seconds", "Kubernetes API calls, until response headers", ["cluster", "method", "resource", "status"]
+)
+SQLITE_QUERY_SECONDS = Histogram(
+    "kedaapp_sqlite_query_duration_seconds", "SQLite statements", ["statement"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1)
+)
+CACHE_REQUESTS = Counter("kedaapp_cache_requests_total", "Lookups in the in-process caches", ["cache", "result"])
+
+
+class RequestMetricsMiddleware:
+    """Plain ASGI middleware, so SSE and other streams pass through untouched.
+
+    Latency is taken when the response starts; the in-flight gauge covers the
+    whole exchange. Routes are labelled by their template, not the raw path.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        started = time.perf_counter()
+        observed = False
+
+        def observe(status: int):
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(method, route.path if route is not None else "unmatched", str(status)).observe(
+                time.perf_counter() - started
+            )
+
+        async def send_with_metrics(message):
+            nonlocal observed
+            if message["type"] == "http.response.start" and not observed:
+                observed = True
+                observe(message["status"])
+            await send(message)
+
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        except Exception:
+            if not observed:
+                observe(500)
+            raise
+        finally:
+            in_flight.dec()
+
+
+app.add_middleware(RequestMetricsMiddleware)
+
+
+def api_resource(resource_path: str) -> str:
+    # "/apis/apps/v1/namespaces/{namespace}/deployments/{name}" and concrete paths alike -> "deployments"
+    segments = resource_path.split('?')[0].strip('/').split('/')
+    rest = segments[2:] if segments[0] == 'api' else segments[3:]
+    if rest[:1] == ['namespaces'] and len(rest) > 2:
+        rest = rest[2:]
+    return rest[0] if rest else "discovery"
+
+
+def instrument_api_calls(call_api, cluster_name: str):
+    """Wrap an ApiClient's call_api; every generated API method and watch goes through it."""
+
+    @functools.wraps(call_api)
+    def timed_call_api(resource_path, method, *args, **kwargs):
+        started = time.perf_counter()
+        status = "error"
+        try:
+            result = call_api(resource_path, method, *args, **kwargs)
+            status = "ok"
+            return result
+        except client.exceptions.ApiException as e:
+            status = str(e.status)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            KUBE_API_SECONDS.labels(cluster_name, method, api_resource(resource_path), status).observe(elapsed)
+            record_span("kube", elapsed)
+
+    return timed_call_api
+
+
+# requests faster than this aren't logged; 0 logs every request
+TRACE_LOG_MIN_MS = float(os.getenv("TRACE_LOG_MIN_MS", "500"))
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "true").lower() == "true"
+PROFILER_INTERVAL = float(os.getenv("PROFILER_INTERVAL", "0.005"))
+PROFILE_HISTORY = int(os.getenv("PROFILE_HISTORY", "20"))
+
+
+class RequestTrace:
+    """Time spent per layer (db, aws, token, kubeconfig, kube, subprocess) during one request.
+
+    Layers nest (a kubeconfig build includes its aws and db time), so the
+    spans are a breakdown to read side by side, not parts that add up.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            total, count = self.spans.get(name, (0.0, 0))
+            self.spans[name] = (total + seconds, count + 1)
+
+    def server_timing(self) -> str:
+        with self._lock:
+            spans = sorted(self.spans.items())
+        entries = [f'{name};dur={total * 1000:.1f};desc="{count} calls"' for name, (total, count) in spans]
+        entries.append(f"app;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(entries)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {name: {"ms": round(total * 1000, 1), "calls": count} for name, (total, count) in self.spans.items()}
+
+
+# set per request; run_blocking copies it into the worker thread along with the rest of the context
+current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+def record_span(name: str, seconds: float):
+    trace = current_trace.get()
+    if trace is not None:
+        trace.add(name, seconds)
+
+
+@contextlib.contextmanager
+def timed(metric, span: str):
+    """Observe the block's duration on a histogram child (if given) and in the current request's trace."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        if metric is not None:
+            metric.observe(elapsed)
+        record_span(span, elapsed)
+
+
+class SamplingProfiler:
+    """Samples the stack of every other thread every PROFILER_INTERVAL seconds.
+
+    The event loop and the blocking pool are shared, so the profile covers
+    whatever the process did while the profiled request ran. Idle threads are
+    skipped. The result is in folded-stack format, one "frame;frame;... count"
+    line per stack, which flamegraph.pl and speedscope render as a flame graph.
+    """
+
+    IDLE_FUNCTIONS = {"wait", "select", "poll", "_worker", "get", "accept", "_run_once", "_wait_for_tstate_lock"}
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> str:
+        self._stop.set()
+        self._thread.join()
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own or frame.f_code.co_name in self.IDLE_FUNCTIONS:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                key = ";".join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.samples += 1
+
+
+profiles = OrderedDict()
+_profiler_lock = threading.Lock()
+
+
+class RequestTracingMiddleware:
+    """Adds Server-Timing to every response and logs one JSON line per request.
+
+    ?profile=1 or an X-Profile: 1 request header also runs a SamplingProfiler
+    for the request (one at a time); the response then carries
+    X-Profile: /profiles/<id> to download the flame graph from.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace()
+        token = current_trace.set(trace)
+        status = 500
+
+        profiler = None
+        profile_id = None
+        headers = dict(scope.get("headers") or [])
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        wants_profile = query.get("profile", [""])[-1] == "1" or headers.get(b"x-profile") == b"1"
+        if PROFILER_ENABLED and wants_profile and _profiler_lock.acquire(blocking=False):
+            profile_id = uuid.uuid4().hex[:12]
+            profiler = SamplingProfiler(PROFILER_INTERVAL)
+            profiler.start()
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                extra = [(b"server-timing", trace.server_timing().encode())]
+                if profile_id is not None:
+                    extra.append((b"x-profile", f"/profiles/{profile_id}".encode()))
+                message = {**message, "headers": list(message.get("headers", [])) + extra}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_trace.reset(token)
+            if profiler is not None:
+                profiles[profile_id] = profiler.stop()
+                while len(profiles) > PROFILE_HISTORY:
+                    profiles.popitem(last=False)
+                _profiler_lock.release()
+
+            total_ms = (time.perf_counter() - trace.started) * 1000
+            if total_ms >= TRACE_LOG_MIN_MS:
+                route = scope.get("route")
+                logger.info(json.dumps({
+                    "event": "request",
+                    "method": scope["method"],
+                    "route": route.path if route is not None else scope["path"],
+                    "status": status,
+                    "total_ms": round(total_ms, 1),
+                    "spans": trace.as_dict(),
+                    "profile": profile_id
+                }))
+
+
+app.add_middleware(RequestTracingMiddleware)
+
+DB_PATH = os.getenv("DB_PATH", "clusters.db")
+DB_BUSY_TIMEOUT = float(os.getenv("DB_BUSY_TIMEOUT", "10"))
+
+
+class Database:
+    """One SQLite connection per thread, opened lazily and kept for the life of the process.
+
+    Handlers touch the database from blocking_executor threads, so the
+    connections are effectively a pool of BLOCKING_POOL_SIZE, plus the event
+    loop thread's own, used by init_db and job_queue.start before any request
+    is served. Each connection is only used by the thread that opened it;
+    check_same_thread is off solely so close_all can close them all from the
+    loop at shutdown.
+
+    WAL journaling lets readers proceed while a writer commits; writers wait up
+    to DB_BUSY_TIMEOUT for each other instead of failing with "database is
+    locked". Each connection keeps its own cache of prepared statements, so
+    repeated lookups skip re-parsing.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=DB_BUSY_TIMEOUT, cached_statements=256, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @staticmethod
+    def _timer(sql: str):
+        return timed(SQLITE_QUERY_SECONDS.labels(sql.lstrip().split(None, 1)[0].upper()), "db")
+
+    def fetch_one(self, sql: str, params: tuple = ()):
+        with self._timer(sql):
+            return self.connection().execute(sql, params).fetchone()
+
+    def fetch_all(self, sql: str, params: tuple = ()) -> list:
+        with self._timer(sql):
+            return self.connection().execute(sql, params).fetchall()
+
+    def execute(self, sql: str, params: tuple = ()) -> int:
+        conn = self.connection()
+        with self._timer(sql), conn:
+            return conn.execute(sql, params).rowcount
+
+    def execute_many(self, sql: str, rows: list) -> int:
+        """All rows in one transaction; nothing is written if any row fails."""
+        conn = self.connection()
+        with self._timer(sql), conn:
+            return conn.executemany(sql, rows).rowcount
+
+    def close_all(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+db = Database(DB_PATH)
+
+
+def _add_cluster_metadata_columns(conn: sqlite3.Connection):
+    existing_columns = {row[1] for row in conn.execute("PRAGMA table_info(clusters)").fetchall()}
+    for column, column_type in (("endpoint", "TEXT"), ("certificate_authority", "TEXT"), ("metadata_refreshed_at", "REAL")):
+        if column not in existing_columns:
+            conn.execute(f"ALTER TABLE clusters ADD COLUMN {column} {column_type}")
+
+
+# Applied in order; PRAGMA user_version records how many already ran.
+# Steps must be idempotent: databases created before versioning start at 0.
+MIGRATIONS = [
+    """
+    CREATE TABLE IF NOT EXISTS clusters (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        access_key TEXT NOT NULL,
+        secret_key TEXT NOT NULL,
+        cluster_name TEXT NOT NULL UNIQUE,
+        region TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS deployments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        cluster_name TEXT NOT NULL,
+        deployment_name TEXT NOT NULL UNIQUE,
+        service_name TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS kafka_topics (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        topic_name TEXT NOT NULL,
+        consumer_group_name TEXT NOT NULL
+    );
+    """,
+    _add_cluster_metadata_columns,
+    """
+    CREATE INDEX IF NOT EXISTS idx_deployments_cluster_name ON deployments (cluster_name);
+    CREATE INDEX IF NOT EXISTS idx_kafka_topics_topic_name ON kafka_topics (topic_name);
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        cluster_name TEXT NOT NULL,
+        status TEXT NOT NULL,
+        request TEXT,
+        result TEXT,
+        error TEXT,
+        created_at REAL NOT NULL,
+        started_at REAL,
+        finished_at REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_jobs_cluster_name ON jobs (cluster_name, created_at);
+    CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+    CREATE TABLE IF NOT EXISTS job_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        job_id TEXT NOT NULL,
+        logged_at REAL NOT NULL,
+        message TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_job_logs_job_id ON job_logs (job_id, id);
+    """,
+]
+
 
 def init_db():
-    conn = sqlite3.connect('clusters.db')
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS clusters (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            access_key TEXT NOT NULL,
-            secret_key TEXT NOT NULL,
-            cluster_name TEXT NOT NULL UNIQUE,
-            region TEXT NOT NULL
-        )
-    """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS deployments (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            cluster_name TEXT NOT NULL,
-            deployment_name TEXT NOT NULL UNIQUE,
-            service_name TEXT NOT NULL
-        )
-    """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS kafka_topics (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            topic_name TEXT NOT NULL,
-            consumer_group_name TEXT NOT NULL
-        )
-    """)
-    conn.commit()
-    conn.close()
+    conn = db.connection()
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        logger.info(f"Applying database migration {number}")
+        if callable(migration):
+            with conn:
+                migration(conn)
+        else:
+            # executescript commits on its own
+            conn.executescript(migration)
+        conn.execute(f"PRAGMA user_version = {number}")
+        conn.commit()
 
 # Call init_db during startup
 @app.on_event("startup")
 def on_startup():
     init_db()
+    eks_tokens.start()
+    lag_monitor.start()
+    job_queue.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    eks_tokens.stop()
+    informers.stop_all()
+    await lag_monitor.stop()
+    await job_queue.stop()
+    await kafka_producers.close()
+    await kafka_admins.close()
+    await kafka_port_forwards.close()
+    blocking_executor.shutdown(wait=False)
+    db.close_all()
 
 
-def get_db_connection():
-    conn = sqlite3.connect('clusters.db')
-    conn.row_factory = sqlite3.Row
-    return conn
 
 class ClusterData(BaseModel):
     access_key: str
@@ -74,14 +503,88 @@ class ClusterData(BaseModel):
     cluster_name: str
     region: str
 
+SEND_MESSAGES_MAX_COUNT = int(os.getenv("SEND_MESSAGES_MAX_COUNT", "1000000"))
+
+
 class KafkaMessageRequest(BaseModel):
     topic_name: str
     message: str
-    message_count: int
+    message_count: int = Field(..., gt=0, le=SEND_MESSAGES_MAX_COUNT)
+    cluster: Optional[str] = None
+    bootstrap_servers: Optional[str] = None
+    port_forward: bool = False
+    acks: str = "1"
+    linger_ms: int = 5
+    max_batch_size: int = 16384
+    compression_type: Optional[str] = None
+
+class LoadJobRequest(BaseModel):
+    topic_name: str
+    rate: float
+    duration_seconds: Optional[float] = None
+    message_count: Optional[int] = None
+    profile: str = "constant"
+    ramp_to_rate: Optional[float] = Field(None, ge=0)
+    ramp_seconds: Optional[float] = Field(None, gt=0)
+    step_rate: float = Field(0, ge=0)
+    step_seconds: float = Field(10, gt=0)
+    burst_rate: Optional[float] = Field(None, ge=0)
+    burst_seconds: float = Field(1, ge=0)
+    burst_interval_seconds: float = Field(10, gt=0)
+    payload_size: int = 0
+    payload_template: str = "{seq} {ts} {padding}"
+    key_distribution: str = "none"
+    key_count: int = 16
+    cluster: Optional[str] = None
+    bootstrap_servers: Optional[str] = None
+    port_forward: bool = False
+    acks: str = "1"
+    linger_ms: int = 5
+    max_batch_size: int = 16384
+    compression_type: Optional[str] = None
+
+class KedaSimulationRequest(BaseModel):
+    # synthetic arrivals, same shapes as the load jobs...
+    profile: str = "constant"
+    rate: float = 0
+    duration_seconds: float = 3600
+    ramp_to_rate: Optional[float] = Field(None, ge=0)
+    ramp_seconds: Optional[float] = Field(None, gt=0)
+    step_rate: float = Field(0, ge=0)
+    step_seconds: float = Field(10, gt=0)
+    burst_rate: Optional[float] = Field(None, ge=0)
+    burst_seconds: float = Field(1, ge=0)
+    burst_interval_seconds: float = Field(10, gt=0)
+    # ...or the production rate the lag monitor recorded for this pair
+    topic_name: Optional[str] = None
+    consumer_group_name: Optional[str] = None
+    per_pod_throughput: float
+    partitions: Optional[int] = None
+    pod_startup_seconds: float = 30
+    resolution_seconds: float = 1
+    initial_backlog: Optional[float] = None
+    sweep: dict[str, list[float]] = {}
+    max_backlog: Optional[float] = None
+    max_drain_seconds: Optional[float] = None
+    top: int = 10
 
 class KafkaTopicRequest(BaseModel):
     topic_name: str
     consumer_group_name: str
+    partitions: int = 1
+    replication_factor: int = 1
+    bootstrap_servers: Optional[str] = None
+    port_forward: bool = False
+
+class KafkaTopicBatchRequest(BaseModel):
+    topics: list[KafkaTopicRequest]
+    bootstrap_servers: Optional[str] = None
+    port_forward: bool = False
+
+class KafkaTopicDescribeRequest(BaseModel):
+    topic_names: list[str] = []
+    bootstrap_servers: Optional[str] = None
+    port_forward: bool = False
 
 class DeploymentData(BaseModel):
     deployment_name: str
@@ -95,22 +598,267 @@ class DeploymentData(BaseModel):
     target_ports: list[int]
     kafka_topic: str
     consumer_group_name: str
+    # ScaledObject settings; the defaults are what every deployment used to get
+    min_replica_count: int = 1
+    max_replica_count: int = 10
+    lag_threshold: int = 10
+    activation_lag_threshold: int = 0
+    polling_interval: int = 30
+    cooldown_period: int = 300
+    offset_reset_policy: str = "latest"
+    # HPA behavior, as in advanced.horizontalPodAutoscalerConfig.behavior
+    scale_up_stabilization_seconds: int = 0
+    scale_up_pods: int = 4
+    scale_up_percent: int = 100
+    scale_up_period_seconds: int = 15
+    scale_down_stabilization_seconds: int = 300
+    scale_down_percent: int = 100
+    scale_down_period_seconds: int = 15
+    # where to look up the topic's partition count
+    bootstrap_servers: Optional[str] = None
+    port_forward: bool = False
+
+class DeploymentBatchRequest(BaseModel):
+    deployments: list[DeploymentData]
+    concurrency: Optional[int] = None
+
+class DeploymentDeleteBatchRequest(BaseModel):
+    deployment_names: list[str] = []
+    label_selector: Optional[str] = None
+    wait: bool = False
+    wait_timeout_seconds: int = 120
+
+
+class AwsClientPool:
+    """boto3 sessions and service clients shared per (access_key, region).
+
+    Building a botocore client loads and parses the service model, which is far
+    more expensive than the API call it is used for, so each one is built once.
+    Clients are thread-safe; sessions are not, so they are only used under the lock.
+    """
 
+    def __init__(self):
+        self._sessions = {}
+        self._clients = {}
+        self._lock = threading.Lock()
 
-def create_eks_kubeconfig(cluster_name: str, region: str, access_key: str, secret_key: str) -> str:
-    try:
-        session = boto3.Session(
-            aws_access_key_id=access_key,
-            aws_secret_access_key=secret_key,
-            region_name=region
+    def client(self, service: str, region: str, access_key: str, secret_key: str, endpoint_url: str = None):
+        key = (service, access_key, region, endpoint_url)
+
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is not None and entry[1] == secret_key:
+                return entry[0]
+
+            session_entry = self._sessions.get((access_key, region))
+            if session_entry is None or session_entry[1] != secret_key:
+                session = boto3.Session(
+                    aws_access_key_id=access_key,
+                    aws_secret_access_key=secret_key,
+                    region_name=region
+                )
+                self._sessions[(access_key, region)] = (session, secret_key)
+            else:
+                session = session_entry[0]
+
+            service_client = session.client(service, region_name=region, endpoint_url=endpoint_url)
+            self._clients[key] = (service_client, secret_key)
+            return service_client
+
+
+aws_clients = AwsClientPool()
+
+
+class ClusterMetadataCache:
+    """EKS endpoint and CA data, kept in memory and persisted on the clusters row.
+
+    describe_cluster is only called when neither copy is younger than the TTL,
+    or after invalidate() because the API server answered 401 or failed TLS.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, cluster_name: str, region: str, access_key: str, secret_key: str) -> tuple:
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(cluster_name)
+        if entry is not None and now - entry[2] < self.ttl_seconds:
+            CACHE_REQUESTS.labels("cluster_metadata", "hit").inc()
+            return entry[0], entry[1]
+
+        row = db.fetch_one(
+            "SELECT endpoint, certificate_authority, metadata_refreshed_at FROM clusters WHERE cluster_name = ?",
+            (cluster_name,)
         )
 
-        eks_client = session.client('eks')
-        cluster_info = eks_client.describe_cluster(name=cluster_name)['cluster']
-        api_server = cluster_info['endpoint']
+        if row and row['endpoint'] and row['metadata_refreshed_at'] and now - row['metadata_refreshed_at'] < self.ttl_seconds:
+            with self._lock:
+                self._entries[cluster_name] = (row['endpoint'], row['certificate_authority'], row['metadata_refreshed_at'])
+            CACHE_REQUESTS.labels("cluster_metadata", "hit").inc()
+            return row['endpoint'], row['certificate_authority']
+
+        CACHE_REQUESTS.labels("cluster_metadata", "miss").inc()
+        eks_client = aws_clients.client('eks', region, access_key, secret_key)
+        with timed(EKS_DESCRIBE_CLUSTER_SECONDS.labels(cluster_name), "aws"):
+            cluster_info = eks_client.describe_cluster(name=cluster_name)['cluster']
+        endpoint = cluster_info['endpoint']
         certificate = cluster_info['certificateAuthority']['data']
 
-        kubeconfig = {
+        db.execute(
+            "UPDATE clusters SET endpoint = ?, certificate_authority = ?, metadata_refreshed_at = ? WHERE cluster_name = ?",
+            (endpoint, certificate, now, cluster_name)
+        )
+
+        with self._lock:
+            self._entries[cluster_name] = (endpoint, certificate, now)
+        return endpoint, certificate
+
+    def invalidate(self, cluster_name: str):
+        with self._lock:
+            self._entries.pop(cluster_name, None)
+
+        db.execute("UPDATE clusters SET metadata_refreshed_at = NULL WHERE cluster_name = ?", (cluster_name,))
+
+
+cluster_metadata = ClusterMetadataCache(ttl_seconds=float(os.getenv("CLUSTER_METADATA_TTL", "3600")))
+
+
+EKS_TOKEN_PREFIX = "k8s-aws-v1."
+K8S_AWS_ID_HEADER = "x-k8s-aws-id"
+# EKS accepts a presigned GetCallerIdentity URL for 15 minutes; aws eks get-token reports 14
+EKS_TOKEN_LIFETIME_SECONDS = 14 * 60
+
+
+def _retrieve_k8s_aws_id(params, context, **kwargs):
+    if K8S_AWS_ID_HEADER in params:
+        context[K8S_AWS_ID_HEADER] = params.pop(K8S_AWS_ID_HEADER)
+
+
+def _inject_k8s_aws_id_header(request, **kwargs):
+    if K8S_AWS_ID_HEADER in request.context:
+        request.headers[K8S_AWS_ID_HEADER] = request.context[K8S_AWS_ID_HEADER]
+
+
+class EksTokenCache:
+    """Bearer tokens for EKS, minted in-process from the stored access key pair.
+
+    This is what `aws eks get-token` does, minus the CLI cold start: presign an
+    STS GetCallerIdentity call carrying the x-k8s-aws-id header. Tokens are
+    cached per cluster and a background thread re-mints them shortly before
+    they expire, so request handlers almost never sign on the hot path.
+    """
+
+    def __init__(self, refresh_margin_seconds: float, refresh_interval_seconds: float):
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def mint(cluster_name: str, region: str, access_key: str, secret_key: str) -> str:
+        sts_client = aws_clients.client('sts', region, access_key, secret_key, endpoint_url=f"https://sts.{region}.amazonaws.com")
+        # the pooled client is shared across clusters, so the header travels in the request context
+        sts_client.meta.events.register(
+            'provide-client-params.sts.GetCallerIdentity', _retrieve_k8s_aws_id, unique_id='k8s-aws-id-params'
+        )
+        sts_client.meta.events.register(
+            'before-sign.sts.GetCallerIdentity', _inject_k8s_aws_id_header, unique_id='k8s-aws-id-header'
+        )
+        url = sts_client.generate_presigned_url(
+            'get_caller_identity',
+            Params={K8S_AWS_ID_HEADER: cluster_name},
+            ExpiresIn=60,
+            HttpMethod='GET'
+        )
+        encoded = base64.urlsafe_b64encode(url.encode('utf-8')).decode('utf-8').rstrip('=')
+        return EKS_TOKEN_PREFIX + encoded
+
+    def get(self, cluster_name: str, region: str, access_key: str, secret_key: str) -> str:
+        credentials = (region, access_key, secret_key)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(cluster_name)
+            if entry is not None and entry['credentials'] == credentials and entry['expires_at'] - now > self.refresh_margin_seconds:
+                entry['last_used'] = now
+                CACHE_REQUESTS.labels("eks_token", "hit").inc()
+                return entry['token']
+
+        CACHE_REQUESTS.labels("eks_token", "miss").inc()
+        with timed(None, "token"):
+            return self._refresh(cluster_name, credentials)
+
+    def invalidate(self, cluster_name: str):
+        with self._lock:
+            self._entries.pop(cluster_name, None)
+
+    def _refresh(self, cluster_name: str, credentials: tuple) -> str:
+        region, access_key, secret_key = credentials
+        try:
+            token = self.mint(cluster_name, region, access_key, secret_key)
+        except Exception as e:
+            logger.error(f"Failed to mint EKS token for {cluster_name}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to mint EKS token: {str(e)}")
+
+        now = time.time()
+        with self._lock:
+            self._entries[cluster_name] = {
+                'token': token,
+                'expires_at': now + EKS_TOKEN_LIFETIME_SECONDS,
+                'credentials': credentials,
+                'last_used': now
+            }
+        return token
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name="eks-token-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval_seconds):
+            now = time.time()
+            with self._lock:
+                # only keep warm the clusters someone asked for within the last token lifetime
+                for cluster_name in [name for name, entry in self._entries.items() if now - entry['last_used'] > EKS_TOKEN_LIFETIME_SECONDS]:
+                    del self._entries[cluster_name]
+                due = [
+                    (name, entry['credentials'])
+                    for name, entry in self._entries.items()
+                    if entry['expires_at'] - now <= self.refresh_margin_seconds + self.refresh_interval_seconds
+                ]
+            for cluster_name, credentials in due:
+                try:
+                    self._refresh(cluster_name, credentials)
+                except HTTPException:
+                    pass
+
+
+eks_tokens = EksTokenCache(
+    refresh_margin_seconds=float(os.getenv("EKS_TOKEN_REFRESH_MARGIN", "60")),
+    refresh_interval_seconds=float(os.getenv("EKS_TOKEN_REFRESH_INTERVAL", "30"))
+)
+
+
+def build_eks_kubeconfig(cluster_name: str, region: str, access_key: str, secret_key: str, target: str = "client") -> dict:
+    try:
+        with timed(KUBECONFIG_BUILD_SECONDS.labels(cluster_name, target), "kubeconfig"):
+            api_server, certificate = cluster_metadata.get(cluster_name, region, access_key, secret_key)
+            token = eks_tokens.get(cluster_name, region, access_key, secret_key)
+
+        return {
             "apiVersion": "v1",
             "kind": "Config",
             "clusters": [
@@ -126,18 +874,7 @@ def create_eks_kubeconfig(cluster_name: str, region: str, access_key: str, secre
                 {
                     "name": "aws",
                     "user": {
-                        "exec": {
-                            "apiVersion": "client.authentication.k8s.io/v1beta1",
-                            "command": "aws",
-                            "args": [
-                                "eks",
-                                "get-token",
-                                "--cluster-name",
-                                cluster_name,
-                                "--region",
-                                region
-                            ]
-                        }
+                        "token": token
                     }
                 }
             ],
@@ -152,158 +889,1713 @@ def create_eks_kubeconfig(cluster_name: str, region: str, access_key: str, secre
             ],
             "current-context": "aws"
         }
+    except Exception as e:
+        logger.error(f"Failed to generate kubeconfig: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to generate kubeconfig: {str(e)}")
+
 
-        kubeconfig_file = f"./{cluster_name}-kubeconfig.yaml"
-        with open(kubeconfig_file, "w") as f:
+def create_eks_kubeconfig(cluster_name: str, region: str, access_key: str, secret_key: str) -> str:
+    """Write a kubeconfig for kubectl and helm; the Python client uses kube_clients instead.
+
+    The file holds a bearer token, so each call gets its own private (0600)
+    temporary file; remove it with os.unlink once the command has read it.
+    """
+    kubeconfig = build_eks_kubeconfig(cluster_name, region, access_key, secret_key, target="file")
+
+    fd, kubeconfig_file = tempfile.mkstemp(prefix=f"{cluster_name}-", suffix="-kubeconfig.yaml")
+    try:
+        with os.fdopen(fd, "w") as f:
             yaml.dump(kubeconfig, f)
 
         return kubeconfig_file
     except Exception as e:
+        os.unlink(kubeconfig_file)
         logger.error(f"Failed to generate kubeconfig: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to generate kubeconfig: {str(e)}")
 
+
+@contextlib.asynccontextmanager
+async def eks_kubeconfig_file(cluster_data):
+    """A kubeconfig path for one kubectl or helm invocation, deleted on exit."""
+    kubeconfig_file = await run_blocking(
+        create_eks_kubeconfig,
+        cluster_data['cluster_name'],
+        cluster_data['region'],
+        cluster_data['access_key'],
+        cluster_data['secret_key']
+    )
+    try:
+        yield kubeconfig_file
+    finally:
+        os.unlink(kubeconfig_file)
+
+
+class KubeClientCache:
+    """Ready-to-use ApiClient per registered cluster, with TTL and LRU eviction.
+
+    Clients are built from an in-memory kubeconfig, so nothing here touches
+    os.environ or the kubernetes default client configuration.
+    """
+
+    def __init__(self, ttl_seconds: float, max_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _fingerprint(cluster_data) -> tuple:
+        return (cluster_data['region'], cluster_data['access_key'], cluster_data['secret_key'])
+
+    def get(self, cluster_data) -> client.ApiClient:
+        cluster_name = cluster_data['cluster_name']
+        fingerprint = self._fingerprint(cluster_data)
+
+        with self._lock:
+            entry = self._entries.get(cluster_name)
+            if entry is not None:
+                api_client, created_at, cached_fingerprint = entry
+                if cached_fingerprint == fingerprint and time.monotonic() - created_at < self.ttl_seconds:
+                    self._entries.move_to_end(cluster_name)
+                    CACHE_REQUESTS.labels("kube_client", "hit").inc()
+                    return api_client
+                self._drop(cluster_name)
+        CACHE_REQUESTS.labels("kube_client", "miss").inc()
+
+        kubeconfig = build_eks_kubeconfig(
+            cluster_data['cluster_name'],
+            cluster_data['region'],
+            cluster_data['access_key'],
+            cluster_data['secret_key']
+        )
+        try:
+            api_client = config.new_client_from_config_dict(kubeconfig, persist_config=False)
+        except Exception as e:
+            logger.error(f"Failed to configure Kubernetes client for {cluster_name}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to configure Kubernetes client: {str(e)}")
+
+        def refresh_token(configuration):
+            configuration.api_key['authorization'] = "Bearer " + eks_tokens.get(
+                cluster_data['cluster_name'],
+                cluster_data['region'],
+                cluster_data['access_key'],
+                cluster_data['secret_key']
+            )
+
+        # the client asks this hook for credentials before every call, so it always sees a fresh token
+        api_client.configuration.refresh_api_key_hook = refresh_token
+        api_client.call_api = instrument_api_calls(api_client.call_api, cluster_name)
+
+        with self._lock:
+            # another request may have built one meanwhile; keep the newest and close the other
+            if cluster_name in self._entries:
+                self._drop(cluster_name)
+            self._entries[cluster_name] = (api_client, time.monotonic(), fingerprint)
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+
+        return api_client
+
+    def invalidate(self, cluster_name: str):
+        with self._lock:
+            if cluster_name in self._entries:
+                self._drop(cluster_name)
+
+    def _drop(self, cluster_name: str):
+        api_client = self._entries.pop(cluster_name)[0]
+        try:
+            api_client.close()
+        except Exception as e:
+            logger.warning(f"Failed to close Kubernetes client for {cluster_name}: {str(e)}")
+
+
+kube_clients = KubeClientCache(
+    ttl_seconds=float(os.getenv("KUBE_CLIENT_CACHE_TTL", "600")),
+    max_size=int(os.getenv("KUBE_CLIENT_CACHE_SIZE", "32"))
+)
+
+
+def invalidate_on_stale_cluster(cluster_name: str, e: Exception):
+    # a 401 or TLS failure usually means a rotated CA/endpoint or a revoked token;
+    # drop everything cached for the cluster so the next request starts from describe_cluster
+    if isinstance(e, client.exceptions.ApiException):
+        stale = e.status == 401
+    else:
+        stale = isinstance(e, (ssl.SSLError, urllib3.exceptions.SSLError)) or \
+            isinstance(getattr(e, 'reason', None), (ssl.SSLError, urllib3.exceptions.SSLError))
+
+    if stale:
+        logger.warning(f"Refreshing cached metadata for {cluster_name} after: {str(e)}")
+        cluster_metadata.invalidate(cluster_name)
+        eks_tokens.invalidate(cluster_name)
+        kube_clients.invalidate(cluster_name)
+
+
+def get_cluster_data(cluster_name: str):
+    cluster_data = db.fetch_one("SELECT * FROM clusters WHERE cluster_name = ?", (cluster_name,))
+
+    if not cluster_data:
+        raise HTTPException(status_code=404, detail="Cluster not found")
+    return cluster_data
+
+
+# Async handlers must never block the event loop: SDK and sqlite calls go to a
+# bounded thread pool, subprocesses run under asyncio with a timeout, and each
+# cluster gets a fixed number of concurrent operations so one slow cluster
+# cannot hold every worker.
+BLOCKING_POOL_SIZE = int(os.getenv("BLOCKING_POOL_SIZE", "32"))
+CLUSTER_CONCURRENCY = int(os.getenv("CLUSTER_CONCURRENCY", "4"))
+SUBPROCESS_TIMEOUT = float(os.getenv("SUBPROCESS_TIMEOUT", "300"))
+
+blocking_executor = ThreadPoolExecutor(max_workers=BLOCKING_POOL_SIZE, thread_name_prefix="blocking")
+_cluster_semaphores = {}
+
+
+async def run_blocking(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    # carry the request's context (its trace) into the worker thread
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(blocking_executor, functools.partial(context.run, func, *args, **kwargs))
+
+
+def cluster_slot(cluster_name: str) -> asyncio.Semaphore:
+    semaphore = _cluster_semaphores.get(cluster_name)
+    if semaphore is None:
+        semaphore = _cluster_semaphores[cluster_name] = asyncio.Semaphore(CLUSTER_CONCURRENCY)
+    return semaphore
+
+
+async def run_command(args: list, check: bool = False, timeout: float = SUBPROCESS_TIMEOUT, input: str = None,
+                      cluster: str = "") -> subprocess.CompletedProcess:
+    started = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdin=asyncio.subprocess.PIPE if input is not None else None,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(
+            process.communicate(input.encode() if input is not None else None),
+            timeout=timeout
+        )
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        SUBPROCESS_SECONDS.labels(cluster, args[0], "timeout").observe(time.perf_counter() - started)
+        record_span("subprocess", time.perf_counter() - started)
+        logger.error(f"Command timed out after {timeout}s: {' '.join(args[:3])}")
+        raise HTTPException(status_code=504, detail=f"Command timed out after {timeout}s: {' '.join(args[:3])}")
+
+    result = subprocess.CompletedProcess(args, process.returncode, stdout.decode(), stderr.decode())
+    SUBPROCESS_SECONDS.labels(cluster, args[0], "ok" if result.returncode == 0 else "failed").observe(time.perf_counter() - started)
+    record_span("subprocess", time.perf_counter() - started)
+    if check and result.returncode != 0:
+        raise subprocess.CalledProcessError(result.returncode, args, result.stdout, result.stderr)
+    return result
+
+
+INFORMER_WATCH_TIMEOUT = int(os.getenv("INFORMER_WATCH_TIMEOUT", "300"))
+INFORMER_IDLE_SECONDS = float(os.getenv("INFORMER_IDLE_SECONDS", "900"))
+INFORMER_SYNC_TIMEOUT = float(os.getenv("INFORMER_SYNC_TIMEOUT", "30"))
+
+
+class IndexedStore:
+    """Thread-safe (namespace, name) -> object map with secondary indexes.
+
+    Each indexer maps an object to the index keys it belongs under, e.g. its
+    namespace or its "namespace/app" label.
+    """
+
+    def __init__(self, indexers: dict):
+        self.indexers = indexers
+        self.listeners = []
+        self._objects = {}
+        self._indexes = {index_name: {} for index_name in indexers}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_of(obj) -> tuple:
+        return (obj.metadata.namespace, obj.metadata.name)
+
+    def replace(self, objects: list):
+        with self._lock:
+            self._objects = {}
+            self._indexes = {index_name: {} for index_name in self.indexers}
+            for obj in objects:
+                self._add(obj)
+        self._notify(None)
+
+    def upsert(self, obj):
+        with self._lock:
+            self._remove(self.key_of(obj))
+            self._add(obj)
+        self._notify(obj)
+
+    def delete(self, obj):
+        with self._lock:
+            self._remove(self.key_of(obj))
+        self._notify(obj)
+
+    def _notify(self, obj):
+        # listeners run on the informer thread; None means the whole store was relisted
+        for listener in list(self.listeners):
+            try:
+                listener(obj)
+            except Exception as e:
+                logger.warning(f"Store listener failed: {str(e)}")
+
+    def get(self, namespace: Optional[str], name: str):
+        with self._lock:
+            return self._objects.get((namespace, name))
+
+    def list(self) -> list:
+        with self._lock:
+            return list(self._objects.values())
+
+    def by_index(self, index_name: str, index_key: str) -> list:
+        with self._lock:
+            keys = self._indexes[index_name].get(index_key, ())
+            return [self._objects[key] for key in keys]
+
+    def _add(self, obj):
+        key = self.key_of(obj)
+        self._objects[key] = obj
+        for index_name, indexer in self.indexers.items():
+            for index_key in indexer(obj):
+                self._indexes[index_name].setdefault(index_key, set()).add(key)
+
+    def _remove(self, key: tuple):
+        obj = self._objects.pop(key, None)
+        if obj is None:
+            return
+        for index_name, indexer in self.indexers.items():
+            for index_key in indexer(obj):
+                keys = self._indexes[index_name].get(index_key)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._indexes[index_name][index_key]
+
+
+def _index_by_namespace(obj) -> list:
+    return [obj.metadata.namespace]
+
+
+def _index_by_app_label(obj) -> list:
+    labels = obj.metadata.labels or {}
+    return [f"{obj.metadata.namespace}/{labels['app']}"] if 'app' in labels else []
+
+
+class Informer:
+    """List once, then follow watch events from the returned resourceVersion.
+
+    A 410 Gone (the resourceVersion fell out of the API server's window) or
+    any other stream failure triggers a fresh list. The thread exits once
+    nobody has read from the informer for INFORMER_IDLE_SECONDS.
+    """
+
+    def __init__(self, cluster_data, kind: str, list_func_for, indexers: dict):
+        self.cluster_data = cluster_data
+        self.kind = kind
+        self.list_func_for = list_func_for
+        self.store = IndexedStore(indexers)
+        self.synced = threading.Event()
+        self.last_error = None
+        self.last_used = time.monotonic()
+        self._stop = threading.Event()
+        self._sync_waiters = []
+        self._sync_lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"informer-{cluster_data['cluster_name']}-{kind}",
+            daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def alive(self) -> bool:
+        return self._thread.is_alive() and not self._stop.is_set()
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+    def _set_synced(self):
+        with self._sync_lock:
+            self.synced.set()
+            waiters, self._sync_waiters = self._sync_waiters, []
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    async def wait_synced(self, timeout: float) -> bool:
+        """Wait on the event loop, not on a pool thread, for the first list to land."""
+        event = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), event)
+        with self._sync_lock:
+            if self.synced.is_set():
+                return True
+            self._sync_waiters.append(waiter)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._sync_lock:
+                if waiter in self._sync_waiters:
+                    self._sync_waiters.remove(waiter)
+        return self.synced.is_set()
+
+    def _run(self):
+        cluster_name = self.cluster_data['cluster_name']
+        backoff = 1.0
+
+        while not self._stop.is_set():
+            if time.monotonic() - self.last_used > INFORMER_IDLE_SECONDS:
+                logger.info(f"Stopping idle {self.kind} informer for {cluster_name}")
+                break
+
+            try:
+                # fetched per relist so token/client rotation in kube_clients is picked up
+                list_func = self.list_func_for(kube_clients.get(self.cluster_data))
+                listing = list_func()
+                self.store.replace(listing.items)
+                resource_version = listing.metadata.resource_version
+                self._set_synced()
+                self.last_error = None
+                backoff = 1.0
+
+                resource_version = self._watch(list_func, resource_version)
+            except Exception as e:
+                if isinstance(e, client.exceptions.ApiException) and e.status == 410:
+                    continue
+                self.last_error = str(e)
+                logger.warning(f"{self.kind} informer for {cluster_name} failed, relisting in {backoff}s: {str(e)}")
+                invalidate_on_stale_cluster(cluster_name, e)
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 60.0)
+
+        self.synced.clear()
+
+    def _watch(self, list_func, resource_version: str):
+        while not self._stop.is_set() and time.monotonic() - self.last_used <= INFORMER_IDLE_SECONDS:
+            stream = watch.Watch().stream(
+                list_func,
+                resource_version=resource_version,
+                timeout_seconds=INFORMER_WATCH_TIMEOUT,
+                allow_watch_bookmarks=True
+            )
+            for event in stream:
+                if self._stop.is_set():
+                    return resource_version
+
+                event_type = event['type']
+                if event_type == 'ERROR':
+                    code = event['raw_object'].get('code')
+                    raise client.exceptions.ApiException(status=code, reason=event['raw_object'].get('message'))
+
+                obj = event['object']
+                resource_version = obj.metadata.resource_version
+                if event_type in ('ADDED', 'MODIFIED'):
+                    self.store.upsert(obj)
+                elif event_type == 'DELETED':
+                    self.store.delete(obj)
+        return resource_version
+
+
+class ClusterInformers:
+    """Pods, deployments, services and namespaces of one cluster, kept in memory."""
+
+    def __init__(self, cluster_data):
+        self.cluster_name = cluster_data['cluster_name']
+        self.pods = Informer(
+            cluster_data, "pods",
+            lambda api_client: client.CoreV1Api(api_client).list_pod_for_all_namespaces,
+            {"namespace": _index_by_namespace, "app": _index_by_app_label}
+        )
+        self.deployments = Informer(
+            cluster_data, "deployments",
+            lambda api_client: client.AppsV1Api(api_client).list_deployment_for_all_namespaces,
+            {"namespace": _index_by_namespace}
+        )
+        self.services = Informer(
+            cluster_data, "services",
+            lambda api_client: client.CoreV1Api(api_client).list_service_for_all_namespaces,
+            {"namespace": _index_by_namespace}
+        )
+        self.namespaces = Informer(
+            cluster_data, "namespaces",
+            lambda api_client: client.CoreV1Api(api_client).list_namespace,
+            {}
+        )
+        self.all = (self.pods, self.deployments, self.services, self.namespaces)
+
+    def start(self):
+        for informer in self.all:
+            informer.start()
+
+    def stop(self):
+        for informer in self.all:
+            informer.stop()
+
+    @property
+    def alive(self) -> bool:
+        return all(informer.alive for informer in self.all)
+
+
+class InformerRegistry:
+    def __init__(self):
+        self._clusters = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cluster_data) -> ClusterInformers:
+        cluster_name = cluster_data['cluster_name']
+        with self._lock:
+            informers = self._clusters.get(cluster_name)
+            if informers is None or not informers.alive:
+                if informers is not None:
+                    informers.stop()
+                informers = ClusterInformers(cluster_data)
+                informers.start()
+                self._clusters[cluster_name] = informers
+            return informers
+
+    async def get(self, cluster_data, *kinds: str) -> ClusterInformers:
+        """Informers for a cluster, started on first use and synced for the given kinds."""
+        informers = self._get(cluster_data)
+        for kind in kinds:
+            informer = getattr(informers, kind)
+            informer.touch()
+            if not await informer.wait_synced(INFORMER_SYNC_TIMEOUT):
+                detail = informer.last_error or f"timed out after {INFORMER_SYNC_TIMEOUT}s"
+                raise HTTPException(status_code=503, detail=f"{kind} cache for {informers.cluster_name} is not ready: {detail}")
+        return informers
+
+    def invalidate(self, cluster_name: str):
+        with self._lock:
+            informers = self._clusters.pop(cluster_name, None)
+        if informers is not None:
+            informers.stop()
+
+    def stop_all(self):
+        with self._lock:
+            for informers in self._clusters.values():
+                informers.stop()
+            self._clusters.clear()
+
+
+informers = InformerRegistry()
+
+
+FIELD_MANAGER = "kedaapp"
+DISCOVERY_TTL = float(os.getenv("DISCOVERY_TTL", "600"))
+CONTENT_HASH_ANNOTATION = "kedaapp/content-hash"
+MANAGED_BY_LABEL = "app.kubernetes.io/managed-by"
+APPLIED_HASH_TTL = float(os.getenv("APPLIED_HASH_TTL", "300"))
+
+
+def stamp_content_hash(manifest: dict) -> dict:
+    annotations = manifest.setdefault("metadata", {}).setdefault("annotations", {})
+    annotations.pop(CONTENT_HASH_ANNOTATION, None)
+    canonical = json.dumps(manifest, sort_keys=True, separators=(",", ":"))
+    annotations[CONTENT_HASH_ANNOTATION] = hashlib.sha256(canonical.encode()).hexdigest()[:32]
+    return manifest
+
+
+@functools.lru_cache(maxsize=32)
+def _parse_manifests(text: str) -> str:
+    return json.dumps([stamp_content_hash(manifest) for manifest in yaml.safe_load_all(text) if manifest])
+
+
+def parse_manifests(text: str) -> list:
+    """YAML documents as hash-stamped dicts; each distinct text is only parsed once."""
+    return json.loads(_parse_manifests(text))
+
+
+class ManifestApplier:
+    """Server-side apply of manifest dicts through the cached ApiClient.
+
+    Resource paths come from API discovery (GET /api/v1, /apis/<group>/<version>),
+    cached per cluster and group/version and refreshed when a kind is missing,
+    e.g. the ScaledObject CRD right after KEDA was installed. Nothing is written
+    to disk and no kubectl process is started.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._discovery = {}
+        self._applied_hashes = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _base_path(api_version: str) -> str:
+        return "/api/v1" if api_version == "v1" else f"/apis/{api_version}"
+
+    def _resources(self, cluster_name: str, api_client, api_version: str, refresh: bool = False) -> dict:
+        key = (cluster_name, api_version)
+        with self._lock:
+            entry = self._discovery.get(key)
+        if entry is not None and not refresh and time.monotonic() - entry[0] < self.ttl_seconds:
+            CACHE_REQUESTS.labels("discovery", "hit").inc()
+            return entry[1]
+
+        CACHE_REQUESTS.labels("discovery", "miss").inc()
+        resource_list = api_client.call_api(
+            self._base_path(api_version), 'GET',
+            header_params={'Accept': 'application/json'},
+            auth_settings=['BearerToken'],
+            response_type='object',
+            _return_http_data_only=True
+        )
+        resources = {
+            resource['kind']: (resource['name'], resource['namespaced'])
+            for resource in resource_list.get('resources', [])
+            if '/' not in resource['name']
+        }
+        with self._lock:
+            self._discovery[key] = (time.monotonic(), resources)
+        return resources
+
+    def resource_path(self, cluster_name: str, api_client, manifest: dict) -> str:
+        api_version, kind = manifest['apiVersion'], manifest['kind']
+        try:
+            resources = self._resources(cluster_name, api_client, api_version)
+        except client.exceptions.ApiException as e:
+            if e.status != 404:
+                raise
+            resources = {}
+        if kind not in resources:
+            try:
+                resources = self._resources(cluster_name, api_client, api_version, refresh=True)
+            except client.exceptions.ApiException as e:
+                if e.status != 404:
+                    raise
+                resources = {}
+        if kind not in resources:
+            raise ValueError(f"{kind} ({api_version}) is not served by the cluster")
+
+        plural, namespaced = resources[kind]
+        metadata = manifest['metadata']
+        path = self._base_path(api_version)
+        if namespaced:
+            path += f"/namespaces/{metadata.get('namespace', 'default')}"
+        return f"{path}/{plural}/{metadata['name']}"
+
+    def invalidate(self, cluster_name: str):
+        with self._lock:
+            for key in [key for key in self._discovery if key[0] == cluster_name]:
+                del self._discovery[key]
+        self.forget(cluster_name)
+
+    def forget(self, cluster_name: str):
+        """Drop remembered content hashes, e.g. after objects were deleted."""
+        with self._lock:
+            for key in [key for key in self._applied_hashes if key[0] == cluster_name]:
+                del self._applied_hashes[key]
+
+    def _is_current(self, cluster_name: str, api_client, path: str, content_hash: str) -> bool:
+        with self._lock:
+            entry = self._applied_hashes.get((cluster_name, path))
+        if entry is not None and entry[0] == content_hash and time.monotonic() - entry[1] < APPLIED_HASH_TTL:
+            CACHE_REQUESTS.labels("applied_hash", "hit").inc()
+            return True
+        CACHE_REQUESTS.labels("applied_hash", "miss").inc()
+
+        try:
+            live = api_client.call_api(
+                path, 'GET',
+                header_params={'Accept': 'application/json'},
+                auth_settings=['BearerToken'],
+                response_type='object',
+                _return_http_data_only=True
+            )
+        except client.exceptions.ApiException as e:
+            if e.status == 404:
+                return False
+            raise
+        live_hash = ((live.get('metadata') or {}).get('annotations') or {}).get(CONTENT_HASH_ANNOTATION)
+        if live_hash == content_hash:
+            with self._lock:
+                self._applied_hashes[(cluster_name, path)] = (content_hash, time.monotonic())
+            return True
+        return False
+
+    def apply_one(self, cluster_data, manifest: dict) -> dict:
+        metadata = manifest.get('metadata') or {}
+        result = {"kind": manifest.get('kind'), "name": metadata.get('name'), "namespace": metadata.get('namespace', 'default')}
+        start = time.perf_counter()
+
+        try:
+            cluster_name = cluster_data['cluster_name']
+            api_client = kube_clients.get(cluster_data)
+            path = self.resource_path(cluster_name, api_client, manifest)
+
+            # an object already carrying this exact content hash needs no write at all
+            content_hash = (metadata.get('annotations') or {}).get(CONTENT_HASH_ANNOTATION)
+            if content_hash and self._is_current(cluster_name, api_client, path, content_hash):
+                result.update(status="unchanged")
+                result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+                return result
+
+            # the client JSON-encodes apply-patch bodies itself, and JSON is valid YAML
+            applied = api_client.call_api(
+                path, 'PATCH',
+                query_params=[('fieldManager', FIELD_MANAGER), ('force', 'true')],
+                header_params={'Content-Type': 'application/apply-patch+yaml', 'Accept': 'application/json'},
+                body=manifest,
+                auth_settings=['BearerToken'],
+                response_type='object',
+                _return_http_data_only=True
+            )
+            result.update(status="applied", resource_version=applied['metadata'].get('resourceVersion'))
+            if content_hash:
+                with self._lock:
+                    self._applied_hashes[(cluster_name, path)] = (content_hash, time.monotonic())
+        except client.exceptions.ApiException as e:
+            invalidate_on_stale_cluster(cluster_data['cluster_name'], e)
+            result.update(status="failed", error=f"{e.status} {e.reason}: {e.body}")
+        except Exception as e:
+            result.update(status="failed", error=str(e))
+
+        result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return result
+
+    async def apply(self, cluster_data, manifests: list) -> list:
+        manifests = [manifest for manifest in manifests if manifest]
+        async with cluster_slot(cluster_data['cluster_name']):
+            return list(await asyncio.gather(*[run_blocking(self.apply_one, cluster_data, manifest) for manifest in manifests]))
+
+
+manifest_applier = ManifestApplier(ttl_seconds=DISCOVERY_TTL)
+
+
+KAFKA_BOOTSTRAP_SERVERS = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "kafka.default.svc.cluster.local:9092")
+KAFKA_BROKER_POD = os.getenv("KAFKA_BROKER_POD", "kafka-0")
+KAFKA_BROKER_PORT = int(os.getenv("KAFKA_BROKER_PORT", "9093"))
+
+
+class KafkaPortForwards:
+    """Long-lived `kubectl port-forward` to the broker pod, one per cluster.
+
+    Only useful when the broker advertises an address the backend can reach
+    through the tunnel; otherwise run the backend in-cluster and connect directly.
+    """
+
+    def __init__(self):
+        self._forwards = {}
+        self._lock = asyncio.Lock()
+
+    async def bootstrap_servers(self, cluster_data) -> str:
+        cluster_name = cluster_data['cluster_name']
+
+        async with self._lock:
+            forward = self._forwards.get(cluster_name)
+            if forward is not None and forward[0].returncode is None:
+                return f"127.0.0.1:{forward[1]}"
+
+            with socket.socket() as sock:
+                sock.bind(("127.0.0.1", 0))
+                local_port = sock.getsockname()[1]
+
+            # kubectl has read the kubeconfig by the time the tunnel is up, so the file can go then
+            async with eks_kubeconfig_file(cluster_data) as kubeconfig_file:
+                process = await asyncio.create_subprocess_exec(
+                    "kubectl", "--kubeconfig", kubeconfig_file, "port-forward", "-n", "default",
+                    f"pod/{KAFKA_BROKER_POD}", f"{local_port}:{KAFKA_BROKER_PORT}",
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE
+                )
+                try:
+                    # kubectl prints "Forwarding from ..." once the tunnel is listening
+                    await asyncio.wait_for(process.stdout.readline(), timeout=15)
+                except asyncio.TimeoutError:
+                    process.kill()
+                    raise HTTPException(status_code=504, detail=f"Timed out starting port-forward to {KAFKA_BROKER_POD}")
+            if process.returncode is not None:
+                stderr = (await process.stderr.read()).decode()
+                raise HTTPException(status_code=500, detail=f"Failed to port-forward to {KAFKA_BROKER_POD}: {stderr}")
+
+            self._forwards[cluster_name] = (process, local_port)
+            return f"127.0.0.1:{local_port}"
+
+    async def close(self):
+        async with self._lock:
+            for process, _ in self._forwards.values():
+                if process.returncode is None:
+                    process.terminate()
+            self._forwards.clear()
+
+
+class KafkaProducerPool:
+    """Started AIOKafkaProducer instances, shared per cluster, brokers and settings.
+
+    get() hands out a reference that the caller gives back with release().
+    A producer that is evicted or reported broken leaves the pool at once, so
+    new callers get a fresh one, but it is only stopped once its last user
+    has released it; a load job is never cut off by someone else's failure.
+    Producers start outside the pool lock, so a broker that doesn't answer
+    only holds up the callers waiting for that same producer.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._producers = OrderedDict()
+        self._users = {}
+        self._starting = {}
+        self._lock = asyncio.Lock()
+
+    async def get(self, cluster_name: Optional[str], bootstrap_servers: str, acks: str, linger_ms: int,
+                  max_batch_size: int, compression_type: Optional[str]) -> AIOKafkaProducer:
+        key = (cluster_name, bootstrap_servers, acks, linger_ms, max_batch_size, compression_type)
+
+        while True:
+            async with self._lock:
+                producer = self._producers.get(key)
+                if producer is not None:
+                    self._producers.move_to_end(key)
+                    self._users[producer] = self._users.get(producer, 0) + 1
+                    return producer
+                starting = self._starting.get(key)
+                if starting is None:
+                    producer = AIOKafkaProducer(
+                        bootstrap_servers=bootstrap_servers,
+                        acks=int(acks) if acks in ("0", "1") else "all",
+                        linger_ms=linger_ms,
+                        max_batch_size=max_batch_size,
+                        compression_type=compression_type
+                    )
+                    starting = self._starting[key] = asyncio.ensure_future(self._start(key, producer))
+            # shared by everyone asking for this key; once it is pooled, take it like any other caller
+            await asyncio.shield(starting)
+
+    async def _start(self, key: tuple, producer: AIOKafkaProducer):
+        try:
+            await producer.start()
+        except BaseException:
+            async with self._lock:
+                del self._starting[key]
+            await producer.stop()
+            raise
+
+        retired = []
+        async with self._lock:
+            del self._starting[key]
+            self._producers[key] = producer
+            while len(self._producers) > self.max_size:
+                _, evicted = self._producers.popitem(last=False)
+                if not self._users.get(evicted):
+                    retired.append(evicted)
+        for evicted in retired:
+            await evicted.stop()
+
+    def _pooled(self, producer: AIOKafkaProducer) -> bool:
+        return any(pooled is producer for pooled in self._producers.values())
+
+    async def release(self, producer: AIOKafkaProducer, broken: bool = False):
+        """Give back a producer from get(); broken=True takes it out of the pool for everyone."""
+        async with self._lock:
+            users = self._users.get(producer)
+            if users is None:
+                logger.warning("Ignoring the release of a Kafka producer the pool didn't hand out")
+                return
+            if broken:
+                for key, pooled in list(self._producers.items()):
+                    if pooled is producer:
+                        del self._producers[key]
+            if users > 1:
+                self._users[producer] = users - 1
+                return
+            del self._users[producer]
+            if self._pooled(producer):
+                return
+        await producer.stop()
+
+    async def close(self):
+        async with self._lock:
+            starting = list(self._starting.values())
+        for task in starting:
+            task.cancel()
+        await asyncio.gather(*starting, return_exceptions=True)
+        async with self._lock:
+            for producer in self._producers.values():
+                await producer.stop()
+            self._producers.clear()
+
+
+class KafkaAdminPool:
+    """Started AIOKafkaAdminClient instances, shared per cluster and brokers.
+
+    At most max_size clients are kept; the least recently used one is closed
+    to make room. Clients start outside the pool lock, like producers.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._clients = OrderedDict()
+        self._starting = {}
+        self._lock = asyncio.Lock()
+
+    async def get(self, cluster_name: Optional[str], bootstrap_servers: str) -> AIOKafkaAdminClient:
+        key = (cluster_name, bootstrap_servers)
+
+        while True:
+            async with self._lock:
+                admin = self._clients.get(key)
+                if admin is not None:
+                    self._clients.move_to_end(key)
+                    return admin
+                starting = self._starting.get(key)
+                if starting is None:
+                    starting = self._starting[key] = asyncio.ensure_future(
+                        self._start(key, AIOKafkaAdminClient(bootstrap_servers=bootstrap_servers))
+                    )
+            await asyncio.shield(starting)
+
+    async def _start(self, key: tuple, admin: AIOKafkaAdminClient):
+        try:
+            await admin.start()
+        except BaseException:
+            async with self._lock:
+                del self._starting[key]
+            await admin.close()
+            raise
+
+        retired = []
+        async with self._lock:
+            del self._starting[key]
+            self._clients[key] = admin
+            while len(self._clients) > self.max_size:
+                retired.append(self._clients.popitem(last=False)[1])
+        for evicted in retired:
+            await evicted.close()
+
+    async def discard(self, cluster_name: Optional[str], bootstrap_servers: str):
+        async with self._lock:
+            admin = self._clients.pop((cluster_name, bootstrap_servers), None)
+        if admin is not None:
+            await admin.close()
+
+    async def close(self):
+        async with self._lock:
+            starting = list(self._starting.values())
+        for task in starting:
+            task.cancel()
+        await asyncio.gather(*starting, return_exceptions=True)
+        async with self._lock:
+            for admin in self._clients.values():
+                await admin.close()
+            self._clients.clear()
+
+
+kafka_port_forwards = KafkaPortForwards()
+kafka_producers = KafkaProducerPool(max_size=int(os.getenv("KAFKA_PRODUCER_POOL_SIZE", "16")))
+kafka_admins = KafkaAdminPool(max_size=int(os.getenv("KAFKA_ADMIN_POOL_SIZE", "16")))
+
+
+async def resolve_bootstrap_servers(cluster: Optional[str], bootstrap_servers: Optional[str], port_forward: bool) -> str:
+    if bootstrap_servers:
+        return bootstrap_servers
+    if port_forward:
+        if not cluster:
+            raise HTTPException(status_code=400, detail="port_forward requires a cluster")
+        cluster_data = await run_blocking(get_cluster_data, cluster)
+        return await kafka_port_forwards.bootstrap_servers(cluster_data)
+    return KAFKA_BOOTSTRAP_SERVERS
+
+
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+
+
+class ResponseCache:
+    """Serialized JSON bodies of read-mostly endpoints, with their ETags.
+
+    Keys are tuples whose first element names the data they were built from;
+    write endpoints call invalidate() with a key prefix. The TTL only guards
+    against writes made outside this process.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._entries = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    async def respond(self, request: Request, key: tuple, build) -> Response:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            generation = self._generation
+
+        CACHE_REQUESTS.labels("response", "miss" if entry is None or now - entry[2] >= self.ttl_seconds else "hit").inc()
+        if entry is None or now - entry[2] >= self.ttl_seconds:
+            body = json.dumps(await build()).encode()
+            entry = (f'"{hashlib.sha256(body).hexdigest()[:32]}"', body, now)
+            with self._lock:
+                # an invalidate() while building means the body may already be stale
+                if generation == self._generation:
+                    self._entries[key] = entry
+
+        etag, body = entry[0], entry[1]
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+            if etag in candidates or "*" in candidates:
+                return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def invalidate(self, *prefix):
+        with self._lock:
+            self._generation += 1
+            for key in [key for key in self._entries if key[:len(prefix)] == prefix]:
+                del self._entries[key]
+
+
+response_cache = ResponseCache(ttl_seconds=RESPONSE_CACHE_TTL)
+
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "8"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_DAYS", "7")) * 86400
+JOB_STREAM_KEEPALIVE = float(os.getenv("JOB_STREAM_KEEPALIVE", "15"))
+JOB_FINISHED_STATUSES = ("succeeded", "failed", "interrupted")
+
+
+def job_row_to_dict(row) -> dict:
+    return {
+        "job_id": row["id"],
+        "kind": row["kind"],
+        "cluster_name": row["cluster_name"],
+        "status": row["status"],
+        "result": json.loads(row["result"]) if row["result"] is not None else None,
+        "error": json.loads(row["error"]) if row["error"] is not None else None,
+        "created_at": row["created_at"],
+        "started_at": row["started_at"],
+        "finished_at": row["finished_at"]
+    }
+
+
+class JobQueue:
+    """Long-running cluster operations, run by a fixed pool of worker tasks.
+
+    Jobs for one cluster run one at a time in submission order; jobs for
+    different clusters run in parallel, up to the number of workers. State,
+    results and log lines go to SQLite as they happen, so status outlives the
+    process: on startup queued jobs are picked up again and jobs that were
+    running are marked interrupted. Submitting a request identical to one that
+    is still queued returns the queued job instead of adding another.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._handlers = {}
+        self._pending = {}
+        self._scheduled = set()
+        self._queued = {}
+        self._watchers = {}
+        self._ready = None
+        self._tasks = []
+
+    def handler(self, kind: str):
+        def register(func):
+            self._handlers[kind] = func
+            return func
+        return register
+
+    def start(self):
+        if self._tasks:
+            return
+        self._ready = asyncio.Queue()
+        now = time.time()
+        db.execute(
+            "UPDATE jobs SET status = 'interrupted', error = ?, finished_at = ? WHERE status = 'running'",
+            (json.dumps("Interrupted by a restart"), now)
+        )
+        db.execute(
+            "DELETE FROM job_logs WHERE job_id IN (SELECT id FROM jobs WHERE finished_at < ?)",
+            (now - JOB_RETENTION_SECONDS,)
+        )
+        db.execute("DELETE FROM jobs WHERE finished_at < ?", (now - JOB_RETENTION_SECONDS,))
+        for row in db.fetch_all("SELECT id, kind, cluster_name, request FROM jobs WHERE status = 'queued' ORDER BY created_at"):
+            self._enqueue(row["id"], row["kind"], row["cluster_name"], row["request"])
+
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        # jobs cut off here stay 'running' in the table and are marked interrupted on the next start
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, kind: str, cluster: str, request: str = None) -> dict:
+        key = (kind, cluster, request)
+        job_id = self._queued.get(key)
+        if job_id is None:
+            job_id = self._queued[key] = uuid.uuid4().hex
+            try:
+                await run_blocking(
+                    db.execute,
+                    "INSERT INTO jobs (id, kind, cluster_name, status, request, created_at) VALUES (?, ?, ?, 'queued', ?, ?)",
+                    (job_id, kind, cluster, request, time.time())
+                )
+            except Exception:
+                del self._queued[key]
+                raise
+            self._enqueue(job_id, kind, cluster, request)
+        return {"job_id": job_id, "status": "queued"}
+
+    def _enqueue(self, job_id: str, kind: str, cluster: str, request: Optional[str]):
+        self._queued[(kind, cluster, request)] = job_id
+        self._pending.setdefault(cluster, deque()).append((job_id, kind, request))
+        # a cluster is on the ready queue at most once, so only one worker ever holds it
+        if cluster not in self._scheduled:
+            self._scheduled.add(cluster)
+            self._ready.put_nowait(cluster)
+
+    async def _worker(self):
+        while True:
+            cluster = await self._ready.get()
+            job_id, kind, request = self._pending[cluster].popleft()
+            if self._queued.get((kind, cluster, request)) == job_id:
+                del self._queued[(kind, cluster, request)]
+            try:
+                await self._run(job_id, kind, cluster, request)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # the job's own errors are caught in _run; this is the bookkeeping failing (the database,
+                # usually), which mustn't take the worker down with it
+                logger.exception(f"Job {job_id} ({kind} on {cluster}) could not be recorded")
+            finally:
+                if self._pending[cluster]:
+                    # back of the line, so a busy cluster doesn't starve the others
+                    self._ready.put_nowait(cluster)
+                else:
+                    del self._pending[cluster]
+                    self._scheduled.discard(cluster)
+
+    async def _run(self, job_id: str, kind: str, cluster: str, request: Optional[str]):
+        await self._update(job_id, status="running", started_at=time.time())
+        result = error = None
+        try:
+            result = await self._handlers[kind](job_id, cluster, request)
+            status = "succeeded"
+        except asyncio.CancelledError:
+            raise
+        except HTTPException as e:
+            status, error = "failed", e.detail
+        except Exception as e:
+            logger.exception(f"Job {job_id} ({kind} on {cluster}) failed")
+            status, error = "failed", str(e)
+
+        if error is not None:
+            try:
+                await self.log(job_id, f"Failed: {error}")
+            except Exception:
+                logger.exception(f"Could not write the failure of job {job_id} to its log")
+        await self._update(
+            job_id,
+            status=status,
+            result=json.dumps(result, default=str) if result is not None else None,
+            error=json.dumps(error, default=str) if error is not None else None,
+            finished_at=time.time()
+        )
+
+    async def _update(self, job_id: str, **fields):
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        await run_blocking(db.execute, f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+        self._notify(job_id)
+
+    async def log(self, job_id: str, message: str):
+        logger.info(f"Job {job_id}: {message}")
+        await run_blocking(
+            db.execute,
+            "INSERT INTO job_logs (job_id, logged_at, message) VALUES (?, ?, ?)",
+            (job_id, time.time(), message)
+        )
+        self._notify(job_id)
+
+    def _notify(self, job_id: str):
+        for event in self._watchers.get(job_id, ()):
+            event.set()
+
+    def watch(self, job_id: str) -> asyncio.Event:
+        event = asyncio.Event()
+        self._watchers.setdefault(job_id, set()).add(event)
+        return event
+
+    def unwatch(self, job_id: str, event: asyncio.Event):
+        watchers = self._watchers.get(job_id)
+        if watchers is not None:
+            watchers.discard(event)
+            if not watchers:
+                del self._watchers[job_id]
+
+    @staticmethod
+    def fetch(job_id: str) -> dict:
+        row = db.fetch_one("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        if not row:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job_row_to_dict(row)
+
+    @staticmethod
+    def fetch_logs(job_id: str, after_id: int = 0) -> list:
+        rows = db.fetch_all(
+            "SELECT id, logged_at, message FROM job_logs WHERE job_id = ? AND id > ? ORDER BY id",
+            (job_id, after_id)
+        )
+        return [{"id": row["id"], "logged_at": row["logged_at"], "message": row["message"]} for row in rows]
+
+
+job_queue = JobQueue(workers=JOB_WORKERS)
+
+
+@app.get('/jobs')
+async def list_jobs(cluster: Optional[str] = None, status: Optional[str] = None, limit: int = Query(100, ge=1, le=1000)):
+    clauses, params = [], []
+    if cluster is not None:
+        clauses.append("cluster_name = ?")
+        params.append(cluster)
+    if status is not None:
+        clauses.append("status = ?")
+        params.append(status)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    rows = await run_blocking(db.fetch_all, f"SELECT * FROM jobs {where} ORDER BY created_at DESC LIMIT ?", (*params, limit))
+    return {"jobs": [job_row_to_dict(row) for row in rows]}
+
+
+@app.get('/jobs/{job_id}')
+async def get_job(job_id: str):
+    job = await run_blocking(job_queue.fetch, job_id)
+    job["logs"] = await run_blocking(job_queue.fetch_logs, job_id)
+    return job
+
+
+# Server-sent events: every log line as it is written, a status event on each change, closed once the job is done
+@app.get('/jobs/{job_id}/stream')
+async def stream_job(job_id: str):
+    await run_blocking(job_queue.fetch, job_id)
+    changed = job_queue.watch(job_id)
+
+    async def events():
+        last_log_id = 0
+        last_status = None
+        try:
+            while True:
+                # cleared before reading, so a change made while we read wakes the next wait
+                changed.clear()
+                for entry in await run_blocking(job_queue.fetch_logs, job_id, last_log_id):
+                    last_log_id = entry["id"]
+                    yield f"event: log\ndata: {json.dumps(entry)}\n\n"
+
+                job = await run_blocking(job_queue.fetch, job_id)
+                if job["status"] != last_status:
+                    last_status = job["status"]
+                    yield f"event: status\ndata: {json.dumps(job)}\n\n"
+                if job["status"] in JOB_FINISHED_STATUSES:
+                    return
+
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout=JOB_STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            job_queue.unwatch(job_id, changed)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # API to register a cluster
 @app.post('/register-cluster')
 async def register_cluster(data: ClusterData):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    try:
-        cursor.execute(
-            "INSERT INTO clusters (access_key, secret_key, cluster_name, region) VALUES (?, ?, ?, ?)", 
+    # registering a name again replaces its credentials and region, so every cache built from the old ones goes
+    def upsert_cluster():
+        existed = db.fetch_one("SELECT 1 FROM clusters WHERE cluster_name = ?", (data.cluster_name,)) is not None
+        db.execute(
+            """
+            INSERT INTO clusters (access_key, secret_key, cluster_name, region) VALUES (?, ?, ?, ?)
+            ON CONFLICT(cluster_name) DO UPDATE SET
+                access_key = excluded.access_key,
+                secret_key = excluded.secret_key,
+                region = excluded.region
+            """,
             (data.access_key, data.secret_key, data.cluster_name, data.region)
         )
-        conn.commit()
-    except sqlite3.IntegrityError:
-        return {"error": "Cluster already registered"}
-    finally:
-        conn.close()
 
+        kube_clients.invalidate(data.cluster_name)
+        eks_tokens.invalidate(data.cluster_name)
+        cluster_metadata.invalidate(data.cluster_name)
+        informers.invalidate(data.cluster_name)
+        manifest_applier.invalidate(data.cluster_name)
+        return existed
+
+    existed = await run_blocking(upsert_cluster)
+    response_cache.invalidate("clusters")
+    if existed:
+        return {"message": "Cluster registration updated"}
     return {"message": "Cluster registered successfully"}
 
 # API to fetch registered clusters
 @app.get('/clusters')
-async def get_clusters():
-    conn = get_db_connection()
-    cursor = conn.cursor()
+async def get_clusters(request: Request):
+    def fetch_clusters():
+        return db.fetch_all("SELECT cluster_name FROM clusters")
+
+    async def build():
+        clusters = await run_blocking(fetch_clusters)
+        return [row['cluster_name'] for row in clusters]
+
+    return await response_cache.respond(request, ("clusters",), build)
+
 
-    clusters = cursor.execute("SELECT cluster_name FROM clusters").fetchall()
-    conn.close()
+@app.get('/metrics')
+async def metrics():
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
-    return [row['cluster_name'] for row in clusters]
+
+# Folded stacks recorded for a request made with ?profile=1 or an X-Profile: 1 header
+@app.get('/profiles/{profile_id}')
+async def get_profile(profile_id: str):
+    folded = profiles.get(profile_id)
+    if folded is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(
+        content=folded,
+        media_type="text/plain",
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'}
+    )
 
 # API to fetch namespaces for a specific cluster
 @app.get('/namespaces')
 async def get_namespaces(cluster: str = Query(...)):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cluster_data = cursor.execute("SELECT * FROM clusters WHERE cluster_name = ?", (cluster,)).fetchone()
-    conn.close()
-
-    if not cluster_data:
-        raise HTTPException(status_code=404, detail="Cluster not found")
+    cluster_data = await run_blocking(get_cluster_data, cluster)
+
+    cluster_informers = await informers.get(cluster_data, "namespaces")
+    namespace_names = sorted(namespace.metadata.name for namespace in cluster_informers.namespaces.store.list())
+
+    return {"namespaces": namespace_names}
+
+
+def summarize_pod(pod) -> dict:
+    container_statuses = pod.status.container_statuses or []
+    pod_status = pod.status.phase  
+    if container_statuses:
+        for container_status in container_statuses:
+            if container_status.state.waiting and container_status.state.waiting.reason:
+                pod_status = container_status.state.waiting.reason  
+            elif container_status.state.terminated and container_status.state.terminated.reason:
+                pod_status = container_status.state.terminated.reason 
+            elif container_status.state.running:
+                pod_status = "Running" 
+            else:
+                pod_status = pod.status.phase  
+
+    cpu_request = 'N/A'
+    memory_request = 'N/A'
+    if pod.spec.containers and pod.spec.containers[0].resources and pod.spec.containers[0].resources.requests:
+        cpu_request = pod.spec.containers[0].resources.requests.get('cpu', 'N/A')
+        memory_request = pod.spec.containers[0].resources.requests.get('memory', 'N/A')
+
+    return {
+        "name": pod.metadata.name,
+        "status": pod_status,
+        "cpu": cpu_request,
+        "memory": memory_request,
+        "namespace": pod.metadata.namespace,
+        "node": pod.spec.node_name,
+        "pod_ip": pod.status.pod_ip,
+        "phase": pod.status.phase
+    }
+
+
+def summarize_pod_dict(pod: dict) -> dict:
+    # same as summarize_pod, for raw API JSON that was never turned into model objects
+    metadata = pod.get('metadata') or {}
+    spec = pod.get('spec') or {}
+    status = pod.get('status') or {}
+
+    pod_status = status.get('phase')
+    for container_status in status.get('containerStatuses') or []:
+        state = container_status.get('state') or {}
+        if (state.get('waiting') or {}).get('reason'):
+            pod_status = state['waiting']['reason']
+        elif (state.get('terminated') or {}).get('reason'):
+            pod_status = state['terminated']['reason']
+        elif state.get('running') is not None:
+            pod_status = "Running"
+        else:
+            pod_status = status.get('phase')
+
+    cpu_request = 'N/A'
+    memory_request = 'N/A'
+    containers = spec.get('containers') or []
+    requests = ((containers[0].get('resources') or {}).get('requests') or {}) if containers else {}
+    if requests:
+        cpu_request = requests.get('cpu', 'N/A')
+        memory_request = requests.get('memory', 'N/A')
+
+    return {
+        "name": metadata.get('name'),
+        "status": pod_status,
+        "cpu": cpu_request,
+        "memory": memory_request,
+        "namespace": metadata.get('namespace'),
+        "node": spec.get('nodeName'),
+        "pod_ip": status.get('podIP'),
+        "phase": status.get('phase')
+    }
+
+
+POD_FIELDS = ("name", "status", "cpu", "memory", "namespace", "node", "pod_ip", "phase")
+DEFAULT_POD_FIELDS = ("name", "status", "cpu", "memory")
+POD_PAGE_SIZE = int(os.getenv("POD_PAGE_SIZE", "500"))
+
+
+def fetch_pod_page(cluster_data, namespace: str, limit: int, continue_token: Optional[str],
+                   label_selector: Optional[str], field_selector: Optional[str]) -> tuple:
+    v1 = client.CoreV1Api(kube_clients.get(cluster_data))
+    kwargs = {"limit": limit, "_preload_content": False}
+    if continue_token:
+        kwargs["_continue"] = continue_token
+    if label_selector:
+        kwargs["label_selector"] = label_selector
+    if field_selector:
+        kwargs["field_selector"] = field_selector
+
+    # raw JSON keeps a page of thousands of pods from being expanded into model objects
+    if namespace.lower() == 'all':
+        response = v1.list_pod_for_all_namespaces(**kwargs)
+    else:
+        response = v1.list_namespaced_pod(namespace, **kwargs)
+    page = json.loads(response.data)
+    return page.get('items') or [], (page.get('metadata') or {}).get('continue') or None
 
-    kubeconfig_file = create_eks_kubeconfig(cluster_data['cluster_name'], cluster_data['region'], cluster_data['access_key'], cluster_data['secret_key'])
-    os.environ["KUBECONFIG"] = kubeconfig_file
 
-    try:
-        config.load_kube_config(config_file=kubeconfig_file)
-        v1 = client.CoreV1Api()
+async def iterate_pod_pages(cluster_data, namespace: str, page_size: int, continue_token: Optional[str],
+                            label_selector: Optional[str], field_selector: Optional[str], single_page: bool):
+    cluster_name = cluster_data['cluster_name']
+    while True:
+        try:
+            async with cluster_slot(cluster_name):
+                items, continue_token = await run_blocking(
+                    fetch_pod_page, cluster_data, namespace, page_size, continue_token, label_selector, field_selector
+                )
+        except client.exceptions.ApiException as e:
+            if e.status == 410:
+                raise HTTPException(status_code=410, detail="Continue token expired, restart the listing")
+            await run_blocking(invalidate_on_stale_cluster, cluster_name, e)
+            raise HTTPException(status_code=500, detail=f"Failed to retrieve pods: {e.reason}")
 
-        namespaces = v1.list_namespace().items
-        namespace_names = [namespace.metadata.name for namespace in namespaces]
+        yield items, continue_token
+        if single_page or not continue_token:
+            return
 
-        return {"namespaces": namespace_names}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to retrieve namespaces: {str(e)}")
 
 # API to fetch pods in a specific cluster and namespace
 @app.get('/pods')
-async def get_pods(cluster: str, namespace: str = 'default'):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cluster_data = cursor.execute("SELECT * FROM clusters WHERE cluster_name = ?", (cluster,)).fetchone()
-    conn.close()
+async def get_pods(cluster: str, namespace: str = 'default', limit: Optional[int] = None,
+                   continue_token: Optional[str] = Query(None, alias="continue"),
+                   label_selector: Optional[str] = None, field_selector: Optional[str] = None,
+                   fields: Optional[str] = None, format: str = 'json'):
+    cluster_data = await run_blocking(get_cluster_data, cluster)
+
+    selected_fields = tuple(field.strip() for field in fields.split(',')) if fields else DEFAULT_POD_FIELDS
+    unknown_fields = [field for field in selected_fields if field not in POD_FIELDS]
+    if unknown_fields:
+        raise HTTPException(status_code=400, detail=f"Unknown pod fields: {', '.join(unknown_fields)}")
+    if format not in ('json', 'ndjson'):
+        raise HTTPException(status_code=400, detail="format must be json or ndjson")
+    if limit is not None and limit <= 0:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+
+    def project(summary: dict) -> dict:
+        return {field: summary[field] for field in selected_fields}
+
+    if limit is None and not continue_token and not label_selector and not field_selector and format == 'json':
+        cluster_informers = await informers.get(cluster_data, "pods")
 
-    if not cluster_data:
-        raise HTTPException(status_code=404, detail="Cluster not found")
+        # Fetch the pods based on the selected namespace
+        if namespace.lower() == 'all':
+            pods = cluster_informers.pods.store.list()
+        else:
+            pods = cluster_informers.pods.store.by_index("namespace", namespace)
+
+        pod_list = [project(summarize_pod(pod)) for pod in sorted(pods, key=IndexedStore.key_of)]
+
+        return {"pods": pod_list}
+
+    # One explicit page: hand the API server's continue token back to the caller
+    if limit is not None and format == 'json':
+        page = iterate_pod_pages(
+            cluster_data, namespace, limit, continue_token, label_selector, field_selector, single_page=True
+        )
+        try:
+            items, next_token = await page.__anext__()
+        finally:
+            await page.aclose()
+        return {"pods": [project(summarize_pod_dict(pod)) for pod in items], "continue": next_token}
+
+    # Otherwise walk every page and stream, so memory stays at one page regardless of cluster size
+    pages = iterate_pod_pages(
+        cluster_data, namespace, limit or POD_PAGE_SIZE, continue_token, label_selector, field_selector,
+        single_page=limit is not None
+    )
+    # pull the first page now so errors still surface as a proper HTTP status
+    try:
+        first_page = await pages.__anext__()
+    except BaseException:
+        await pages.aclose()
+        raise
 
-    kubeconfig_file = create_eks_kubeconfig(cluster_data['cluster_name'], cluster_data['region'], cluster_data['access_key'], cluster_data['secret_key'])
-    os.environ["KUBECONFIG"] = kubeconfig_file
+    async def remaining_pages():
+        # closed here too, so a client that disconnects mid-stream doesn't leave the walk to the GC
+        try:
+            yield first_page
+            async for page in pages:
+                yield page
+        finally:
+            await pages.aclose()
+
+    if format == 'ndjson':
+        async def ndjson_lines():
+            async for items, next_token in remaining_pages():
+                for pod in items:
+                    yield json.dumps(project(summarize_pod_dict(pod))) + "\n"
+                if limit is not None and next_token:
+                    yield json.dumps({"continue": next_token}) + "\n"
+
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+    async def json_chunks():
+        yield '{"pods": ['
+        first = True
+        async for items, _ in remaining_pages():
+            for pod in items:
+                yield ("" if first else ",") + json.dumps(project(summarize_pod_dict(pod)))
+                first = False
+        yield ']}'
+
+    return StreamingResponse(json_chunks(), media_type="application/json")
+
+
+FANOUT_TIMEOUT = float(os.getenv("FANOUT_TIMEOUT", "10"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+
+
+class CircuitBreaker:
+    """Stops fan-out calls to a cluster after repeated failures.
+
+    Once BREAKER_FAILURE_THRESHOLD calls in a row failed, the cluster is skipped
+    for BREAKER_RESET_SECONDS; after that a single trial call decides whether it
+    closes again or stays open for another period. Results of calls admitted
+    before the breaker opened are ignored; only the trial can close it.
+    """
 
-    try:
-        config.load_kube_config(config_file=kubeconfig_file)
-        v1 = client.CoreV1Api()
+    def __init__(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= BREAKER_RESET_SECONDS:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> Optional[str]:
+        """None if the call must be skipped, else "trial" for the half-open probe or "call" for a normal one."""
+        state = self.state
+        if state == "closed":
+            return "call"
+        if state == "half_open" and not self.trial_running:
+            self.trial_running = True
+            return "trial"
+        return None
+
+    def record_success(self, admission: str):
+        if self.opened_at is not None and admission != "trial":
+            return
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self, admission: str):
+        if self.opened_at is not None and admission != "trial":
+            return
+        self.failures += 1
+        if admission == "trial" or self.failures >= BREAKER_FAILURE_THRESHOLD:
+            self.opened_at = time.monotonic()
+
+    def end_call(self, admission: str):
+        # also covers a trial cancelled before it recorded anything, which must not block the next one
+        if admission == "trial":
+            self.trial_running = False
+
+
+_cluster_breakers = {}
+
+
+def cluster_breaker(cluster_name: str) -> CircuitBreaker:
+    breaker = _cluster_breakers.get(cluster_name)
+    if breaker is None:
+        breaker = _cluster_breakers[cluster_name] = CircuitBreaker()
+    return breaker
+
+
+def fanout_cluster_names(clusters: Optional[str]) -> list:
+    registered = [row['cluster_name'] for row in db.fetch_all("SELECT cluster_name FROM clusters")]
+    if not clusters:
+        return registered
+    requested = list(dict.fromkeys(name.strip() for name in clusters.split(',') if name.strip()))
+    unknown = [name for name in requested if name not in registered]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown clusters: {', '.join(unknown)}")
+    return requested
+
+
+async def fan_out(cluster_names: list, fetch, timeout_seconds: float) -> dict:
+    """Run fetch(cluster_data) for every cluster at once, each under its own timeout.
+
+    A slow or failing cluster only costs its own entry: every result carries
+    ok/error/latency_ms, and the whole call takes as long as the slowest
+    cluster that answers within the timeout.
+    """
+    started = time.perf_counter()
 
-        # Fetch the pods based on the selected namespace
+    async def one(cluster_name: str) -> dict:
+        result = {"cluster": cluster_name}
+        breaker = cluster_breaker(cluster_name)
+        admission = breaker.allow()
+        if admission is None:
+            result.update(ok=False, error="circuit open", latency_ms=0.0, breaker=breaker.state)
+            return result
+
+        call_started = time.perf_counter()
+        try:
+            cluster_data = await run_blocking(get_cluster_data, cluster_name)
+            result.update(await asyncio.wait_for(fetch(cluster_data), timeout_seconds))
+            result["ok"] = True
+            breaker.record_success(admission)
+        except asyncio.TimeoutError:
+            result.update(ok=False, error=f"timed out after {timeout_seconds}s")
+            breaker.record_failure(admission)
+        except HTTPException as e:
+            result.update(ok=False, error=str(e.detail))
+            breaker.record_failure(admission)
+        except Exception as e:
+            logger.error(f"Fan-out call to {cluster_name} failed: {str(e)}")
+            result.update(ok=False, error=str(e))
+            breaker.record_failure(admission)
+        finally:
+            breaker.end_call(admission)
+        result["latency_ms"] = round((time.perf_counter() - call_started) * 1000, 1)
+        result["breaker"] = breaker.state
+        return result
+
+    results = await asyncio.gather(*[one(cluster_name) for cluster_name in cluster_names])
+    return {
+        "clusters": list(results),
+        "ok": sum(1 for result in results if result["ok"]),
+        "failed": sum(1 for result in results if not result["ok"]),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+    }
+
+
+# Pods of all (or the listed, comma-separated) clusters in one call
+@app.get('/clusters/pods')
+async def get_pods_all_clusters(clusters: Optional[str] = None, namespace: str = 'default',
+                                fields: Optional[str] = None, timeout_seconds: float = FANOUT_TIMEOUT):
+    selected_fields = tuple(field.strip() for field in fields.split(',')) if fields else DEFAULT_POD_FIELDS
+    unknown_fields = [field for field in selected_fields if field not in POD_FIELDS]
+    if unknown_fields:
+        raise HTTPException(status_code=400, detail=f"Unknown pod fields: {', '.join(unknown_fields)}")
+    cluster_names = await run_blocking(fanout_cluster_names, clusters)
+
+    async def fetch(cluster_data) -> dict:
+        cluster_informers = await informers.get(cluster_data, "pods")
         if namespace.lower() == 'all':
-            pods = v1.list_pod_for_all_namespaces().items
+            pods = cluster_informers.pods.store.list()
         else:
-            pods = v1.list_namespaced_pod(namespace).items
-
-        pod_list = []
-        for pod in pods:
-            container_statuses = pod.status.container_statuses or []
-            pod_status = pod.status.phase  
-            if container_statuses:
-                for container_status in container_statuses:
-                    if container_status.state.waiting and container_status.state.waiting.reason:
-                        pod_status = container_status.state.waiting.reason  
-                    elif container_status.state.terminated and container_status.state.terminated.reason:
-                        pod_status = container_status.state.terminated.reason 
-                    elif container_status.state.running:
-                        pod_status = "Running" 
-                    else:
-                        pod_status = pod.status.phase  
-
-            cpu_request = 'N/A'
-            memory_request = 'N/A'
-            if pod.spec.containers and pod.spec.containers[0].resources and pod.spec.containers[0].resources.requests:
-                cpu_request = pod.spec.containers[0].resources.requests.get('cpu', 'N/A')
-                memory_request = pod.spec.containers[0].resources.requests.get('memory', 'N/A')
-
-            pod_list.append({
-                "name": pod.metadata.name,
-                "status": pod_status,
-                "cpu": cpu_request,
-                "memory": memory_request
+            pods = cluster_informers.pods.store.by_index("namespace", namespace)
+        summaries = [summarize_pod(pod) for pod in sorted(pods, key=IndexedStore.key_of)]
+        return {"pods": [{field: summary[field] for field in selected_fields} for summary in summaries]}
+
+    return await fan_out(cluster_names, fetch, timeout_seconds)
+
+
+# Deployments recorded for all (or the listed) clusters, with their live replica counts
+@app.get('/clusters/deployments')
+async def get_deployments_all_clusters(clusters: Optional[str] = None, timeout_seconds: float = FANOUT_TIMEOUT):
+    cluster_names = await run_blocking(fanout_cluster_names, clusters)
+
+    async def fetch(cluster_data) -> dict:
+        rows = await run_blocking(
+            db.fetch_all, "SELECT deployment_name FROM deployments WHERE cluster_name = ?", (cluster_data['cluster_name'],)
+        )
+        cluster_informers = await informers.get(cluster_data, "deployments")
+        deployments = []
+        for row in rows:
+            deployment = cluster_informers.deployments.store.get("default", row["deployment_name"])
+            deployments.append({
+                "name": row["deployment_name"],
+                "found": deployment is not None,
+                "replicas": deployment.spec.replicas if deployment else None,
+                "ready_replicas": (deployment.status.ready_replicas or 0) if deployment else None,
+                "available_replicas": (deployment.status.available_replicas or 0) if deployment else None
             })
+        return {"deployments": deployments}
+
+    return await fan_out(cluster_names, fetch, timeout_seconds)
 
-        return {"pods": pod_list}
 
-    except client.exceptions.ApiException as e:
-        raise HTTPException(status_code=500, detail=f"Failed to retrieve pods: {e.reason}")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to retrieve pods: {str(e)}")
 
 
+def statefulset_pods_if_installed(cluster_data, name: str) -> Optional[str]:
+    api_client = kube_clients.get(cluster_data)
+    try:
+        client.AppsV1Api(api_client).read_namespaced_stateful_set(name=name, namespace="default")
+    except client.exceptions.ApiException as e:
+        if e.status == 404:
+            return None
+        raise
+    pods = client.CoreV1Api(api_client).list_namespaced_pod(namespace="default", label_selector=f"app={name}")
+    return json.dumps(api_client.sanitize_for_serialization(pods))
 
 
-# API to install Kafka with one replica in the cluster
-@app.post('/install-kafka/{cluster}')
+# API to install Kafka with one replica in the cluster; the install runs as a background job
+@app.post('/install-kafka/{cluster}', status_code=202)
 async def install_kafka(cluster: str):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cluster_data = cursor.execute("SELECT * FROM clusters WHERE cluster_name = ?", (cluster,)).fetchone()
-    conn.close()
-
-    if not cluster_data:
-        raise HTTPException(status_code=404, detail="Cluster not found")
+    await run_blocking(get_cluster_data, cluster)
+    return await job_queue.submit("install_kafka", cluster)
 
-    kubeconfig_file = create_eks_kubeconfig(cluster_data['cluster_name'], cluster_data['region'], cluster_data['access_key'], cluster_data['secret_key'])
-    os.environ["KUBECONFIG"] = kubeconfig_file
 
+@job_queue.handler("install_kafka")
+async def run_install_kafka(job_id: str, cluster: str, request: Optional[str]) -> dict:
+    cluster_data = await run_blocking(get_cluster_data, cluster)
 
-    zookeeper_installed = subprocess.run(["kubectl", "get", "statefulset", "zk", "-n", "default"], capture_output=True, text=True)
-    if "zk" in zookeeper_installed.stdout:
-        zookeeper_status = subprocess.run(["kubectl", "get", "pods", "-l", "app=zk", "-n", "default", "-o", "json"], capture_output=True, text=True)
-        zookeeper_info = zookeeper_status.stdout
-        return {"message": "Kafka & Zookeeper are already installed", "details": zookeeper_info}
-    kafka_installed = subprocess.run(["kubectl", "get", "statefulset", "kafka", "-n", "default"], capture_output=True, text=True)
-    if "kafka" in kafka_installed.stdout:
-        kafka_status = subprocess.run(["kubectl", "get", "pods", "-l", "app=kafka", "-n", "default", "-o", "json"], capture_output=True, text=True)
-        kafka_info = kafka_status.stdout
-        return {"message": "Kafka is already installed", "details": kafka_info}
+    await job_queue.log(job_id, "Checking for an existing Kafka install")
+    try:
+        zookeeper_info = await run_blocking(statefulset_pods_if_installed, cluster_data, "zk")
+        if zookeeper_info is not None:
+            return {"message": "Kafka & Zookeeper are already installed", "details": zookeeper_info}
+        kafka_info = await run_blocking(statefulset_pods_if_installed, cluster_data, "kafka")
+        if kafka_info is not None:
+            return {"message": "Kafka is already installed", "details": kafka_info}
+    except client.exceptions.ApiException as e:
+        await run_blocking(invalidate_on_stale_cluster, cluster_data['cluster_name'], e)
+        raise HTTPException(status_code=500, detail=f"Failed to check for an existing Kafka install: {e.reason}")
 
 
     zookeeper_yaml = """
@@ -427,17 +2719,6 @@ spec:
         emptyDir: {}
     """
 
-    zookeeper_deployment_file = "/tmp/zookeeper-deployment.yaml"
-    with open(zookeeper_deployment_file, "w") as f:
-        f.write(zookeeper_yaml)
-
-    try:
-        zookeeper_result = subprocess.run(["kubectl", "apply", "-f", zookeeper_deployment_file], check=True, capture_output=True, text=True)
-        logger.info(f"Zookeeper apply output: {zookeeper_result.stdout}")
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Error running kubectl apply for Zookeeper: {e.stderr}")
-        raise HTTPException(status_code=500, detail=f"Failed to apply Zookeeper deployment: {e.stderr}")
-
     kafka_yaml = """
 apiVersion: v1
 kind: Service
@@ -599,435 +2880,1653 @@ spec:
         emptyDir: {}
     """
 
-    kafka_deployment_file = "/tmp/kafka-deployment.yaml"
-    with open(kafka_deployment_file, "w") as f:
-        f.write(kafka_yaml)
+    # Zookeeper and Kafka objects are independent as far as the API server is concerned;
+    # the brokers simply retry until Zookeeper is reachable
+    await job_queue.log(job_id, "Applying Zookeeper and Kafka manifests")
+    results = await manifest_applier.apply(cluster_data, parse_manifests(zookeeper_yaml) + parse_manifests(kafka_yaml))
+    logger.info(f"Kafka and Zookeeper apply results: {results}")
+    for result in results:
+        await job_queue.log(job_id, f"{result['kind']} {result['name']}: {result['status']}")
+    if any(result["status"] == "failed" for result in results):
+        raise HTTPException(status_code=500, detail={"message": "Failed to apply Kafka and Zookeeper resources", "results": results})
+
+    return {"message": "Kafka and Zookeeper installed", "results": results}
 
-    try:
-        kafka_result = subprocess.run(["kubectl", "apply", "-f", kafka_deployment_file], check=True, capture_output=True, text=True)
-        logger.info(f"Kubectl apply output: {kafka_result.stdout}")
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Error running kubectl apply for Kafka: {e.stderr}")
-        raise HTTPException(status_code=500, detail=f"Failed to apply Kafka deployment: {e.stderr}")
 
-    return {"message": "Kafka and Zookeeper installed"}
 
 
 
+async def get_kafka_admin(cluster: str, bootstrap_servers: Optional[str], port_forward: bool):
+    bootstrap_servers = await resolve_bootstrap_servers(cluster, bootstrap_servers, port_forward)
+    try:
+        return await kafka_admins.get(cluster, bootstrap_servers), bootstrap_servers
+    except Exception as e:
+        logger.error(f"Failed to connect Kafka admin client to {bootstrap_servers}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to connect to Kafka at {bootstrap_servers}: {str(e)}")
 
 
-@app.post('/create-kafka-topic/{cluster}')
+async def create_topics(cluster: str, topics: list, bootstrap_servers: Optional[str], port_forward: bool) -> list:
+    admin, bootstrap_servers = await get_kafka_admin(cluster, bootstrap_servers, port_forward)
+
+    try:
+        response = await admin.create_topics([
+            NewTopic(name=topic.topic_name, num_partitions=topic.partitions, replication_factor=topic.replication_factor)
+            for topic in topics
+        ])
+    except Exception as e:
+        await kafka_admins.discard(cluster, bootstrap_servers)
+        logger.error(f"Failed to create Kafka topics: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to create Kafka topics: {str(e)}")
+
+    # topic_errors entries are (topic, error_code[, error_message]) depending on protocol version
+    errors = {entry[0]: entry[1] for entry in response.topic_errors}
+    results = []
+    for topic in topics:
+        error_code = errors.get(topic.topic_name, 0)
+        results.append({
+            "topic_name": topic.topic_name,
+            "consumer_group_name": topic.consumer_group_name,
+            "partitions": topic.partitions,
+            "created": error_code == 0,
+            "error": None if error_code == 0 else for_code(error_code).__name__
+        })
+
+    created = [(result["topic_name"], result["consumer_group_name"]) for result in results if result["created"]]
+
+    def insert_topics():
+        db.execute_many("INSERT INTO kafka_topics (topic_name, consumer_group_name) VALUES (?, ?)", created)
+
+    if created:
+        await run_blocking(insert_topics)
+        response_cache.invalidate("kafka_topics")
+    return results
+
+
+@app.post('/create-kafka-topic/{cluster}', status_code=202)
 async def create_kafka_topic(cluster: str, request: KafkaTopicRequest):
+    await run_blocking(get_cluster_data, cluster)
+    return await job_queue.submit("create_kafka_topic", cluster, request.json())
+
+
+@job_queue.handler("create_kafka_topic")
+async def run_create_kafka_topic(job_id: str, cluster: str, request: Optional[str]) -> dict:
+    request = KafkaTopicRequest.parse_raw(request)
+
+    await job_queue.log(job_id, f"Creating topic {request.topic_name} with {request.partitions} partition(s)")
+    result = (await create_topics(cluster, [request], request.bootstrap_servers, request.port_forward))[0]
+    if not result["created"]:
+        logger.error(f"Failed to create Kafka topic {request.topic_name}: {result['error']}")
+        status_code = 409 if result["error"] == "TopicAlreadyExistsError" else 500
+        raise HTTPException(status_code=status_code, detail=f"Failed to create Kafka topic: {result['error']}")
+
+    logger.info(f"Created Kafka topic {request.topic_name} with {request.partitions} partition(s)")
+    return {"message": f"Created topic {request.topic_name} and consumer group {request.consumer_group_name}"}
+
+
+@app.post('/kafka-topics/{cluster}/batch')
+async def create_kafka_topics_batch(cluster: str, request: KafkaTopicBatchRequest):
+    await run_blocking(get_cluster_data, cluster)
+
+    if not request.topics:
+        raise HTTPException(status_code=400, detail="No topics given")
+
+    results = await create_topics(cluster, request.topics, request.bootstrap_servers, request.port_forward)
+    return {"topics": results}
+
+
+@app.post('/kafka-topics/{cluster}/describe')
+async def describe_kafka_topics(cluster: str, request: KafkaTopicDescribeRequest):
+    await run_blocking(get_cluster_data, cluster)
+    admin, bootstrap_servers = await get_kafka_admin(cluster, request.bootstrap_servers, request.port_forward)
+
+    try:
+        topics = await admin.describe_topics(request.topic_names or None)
+    except Exception as e:
+        await kafka_admins.discard(cluster, bootstrap_servers)
+        raise HTTPException(status_code=500, detail=f"Failed to describe Kafka topics: {str(e)}")
+
+    return {"topics": [
+        {
+            "topic_name": topic["topic"],
+            "error": None if topic["error_code"] == 0 else for_code(topic["error_code"]).__name__,
+            "partitions": [
+                {"partition": partition["partition"], "leader": partition["leader"], "replicas": partition["replicas"]}
+                for partition in topic["partitions"]
+            ]
+        }
+        for topic in topics
+        if not topic.get("is_internal")
+    ]}
+
+
+@app.get('/kafka-topics/{cluster}/broker')
+async def list_broker_topics(cluster: str, bootstrap_servers: Optional[str] = None, port_forward: bool = False):
+    await run_blocking(get_cluster_data, cluster)
+    admin, bootstrap_servers = await get_kafka_admin(cluster, bootstrap_servers, port_forward)
+
     try:
-        topic_name = request.topic_name
-        consumer_group_name = request.consumer_group_name
- 
-        zookeeper_service = "zk-cs.default.svc.cluster.local:2181"
+        topics, groups = await asyncio.gather(admin.list_topics(), admin.list_consumer_groups())
+    except Exception as e:
+        await kafka_admins.discard(cluster, bootstrap_servers)
+        raise HTTPException(status_code=500, detail=f"Failed to list Kafka topics: {str(e)}")
+
+    return {
+        "topics": sorted(topic for topic in topics if not topic.startswith("__")),
+        "consumer_groups": sorted(group[0] for group in groups)
+    }
+
+
+LAG_MONITOR_ENABLED = os.getenv("LAG_MONITOR_ENABLED", "true").lower() == "true"
+LAG_SAMPLE_INTERVAL = float(os.getenv("LAG_SAMPLE_INTERVAL", "15"))
+LAG_DISCOVERY_INTERVAL = float(os.getenv("LAG_DISCOVERY_INTERVAL", "60"))
+LAG_HISTORY_SIZE = int(os.getenv("LAG_HISTORY_SIZE", "2880"))
+# reach ScaledObject brokers through the kubectl tunnel instead of their in-cluster address
+LAG_MONITOR_PORT_FORWARD = os.getenv("LAG_MONITOR_PORT_FORWARD", "false").lower() == "true"
+
+
+class LagSeries:
+    """Lag samples of one (brokers, topic, consumer group), oldest first, bounded to LAG_HISTORY_SIZE."""
+
+    def __init__(self, target: dict):
+        self.target = target
+        self.samples = deque(maxlen=LAG_HISTORY_SIZE)
+        self.error = None
+
+    def add(self, sample: dict):
+        if self.samples:
+            previous = self.samples[-1]
+            elapsed = sample["ts"] - previous["ts"]
+            if elapsed > 0:
+                # rates only over partitions present in both samples, so a new partition isn't a spike
+                shared = [p for p in sample["partitions"] if p in previous["partitions"]]
+                consumed = sum(
+                    sample["partitions"][p]["committed"] - previous["partitions"][p]["committed"]
+                    for p in shared
+                    if sample["partitions"][p]["committed"] is not None and previous["partitions"][p]["committed"] is not None
+                )
+                produced = sum(sample["partitions"][p]["end"] - previous["partitions"][p]["end"] for p in shared)
+                sample["consumption_rate"] = round(consumed / elapsed, 3)
+                sample["production_rate"] = round(produced / elapsed, 3)
+        self.samples.append(sample)
+        self.error = None
+
+    def summary(self) -> dict:
+        latest = self.samples[-1] if self.samples else None
+        return {
+            **self.target,
+            "total_lag": latest["total_lag"] if latest else None,
+            "consumption_rate": latest.get("consumption_rate") if latest else None,
+            "production_rate": latest.get("production_rate") if latest else None,
+            "sampled_at": latest["ts"] if latest else None,
+            "samples": len(self.samples),
+            "error": self.error
+        }
+
+
+class LagMonitor:
+    """Background sampler of consumer-group lag.
+
+    Targets are every row of kafka_topics (against KAFKA_BOOTSTRAP_SERVERS) plus
+    the kafka triggers of every ScaledObject on the registered clusters, so the
+    lag can be read next to the lagThreshold KEDA scales on. End offsets come
+    from one group-less consumer per broker address, committed offsets from the
+    pooled admin clients.
+    """
 
+    def __init__(self):
+        self.series = {}
+        self._consumers = {}
+        self._scaled_object_targets = {}
+        self._discovered_at = 0.0
+        self._task = None
+
+    def start(self):
+        if LAG_MONITOR_ENABLED and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for consumer in self._consumers.values():
+            await consumer.stop()
+        self._consumers.clear()
+
+    async def _consumer(self, bootstrap_servers: str) -> AIOKafkaConsumer:
+        consumer = self._consumers.get(bootstrap_servers)
+        if consumer is None:
+            consumer = AIOKafkaConsumer(bootstrap_servers=bootstrap_servers, enable_auto_commit=False)
+            await consumer.start()
+            self._consumers[bootstrap_servers] = consumer
+        return consumer
+
+    async def _discard(self, cluster_name: Optional[str], bootstrap_servers: str):
+        consumer = self._consumers.pop(bootstrap_servers, None)
+        if consumer is not None:
+            await consumer.stop()
+        await kafka_admins.discard(cluster_name, bootstrap_servers)
+
+    async def _discover_scaled_objects(self) -> dict:
+        def list_scaled_objects(cluster_data) -> list:
+            custom_objects_api = client.CustomObjectsApi(kube_clients.get(cluster_data))
+            return custom_objects_api.list_cluster_custom_object("keda.sh", "v1alpha1", "scaledobjects").get("items", [])
+
+        targets = {}
+        for row in await run_blocking(db.fetch_all, "SELECT * FROM clusters"):
+            cluster_name = row['cluster_name']
+            try:
+                scaled_objects = await run_blocking(list_scaled_objects, row)
+                port_forwarded = await kafka_port_forwards.bootstrap_servers(row) if LAG_MONITOR_PORT_FORWARD else None
+            except Exception as e:
+                # KEDA not installed, cluster unreachable: the next discovery round tries again
+                logger.warning(f"Lag monitor could not list ScaledObjects on {cluster_name}: {str(e)}")
+                continue
+
+            for scaled_object in scaled_objects:
+                for trigger in scaled_object.get("spec", {}).get("triggers", []):
+                    metadata = trigger.get("metadata") or {}
+                    if trigger.get("type") != "kafka" or not metadata.get("topic") or not metadata.get("consumerGroup"):
+                        continue
+                    bootstrap_servers = port_forwarded or metadata.get("bootstrapServers", KAFKA_BOOTSTRAP_SERVERS)
+                    targets[(bootstrap_servers, metadata["topic"], metadata["consumerGroup"])] = {
+                        "cluster": cluster_name,
+                        "bootstrap_servers": bootstrap_servers,
+                        "topic_name": metadata["topic"],
+                        "consumer_group_name": metadata["consumerGroup"],
+                        "scaled_object": f"{scaled_object['metadata'].get('namespace')}/{scaled_object['metadata']['name']}",
+                        "lag_threshold": metadata.get("lagThreshold")
+                    }
+        return targets
+
+    async def _targets(self) -> dict:
+        if time.monotonic() - self._discovered_at >= LAG_DISCOVERY_INTERVAL:
+            self._scaled_object_targets = await self._discover_scaled_objects()
+            self._discovered_at = time.monotonic()
+
+        targets = {}
+        for row in await run_blocking(db.fetch_all, "SELECT topic_name, consumer_group_name FROM kafka_topics"):
+            targets[(KAFKA_BOOTSTRAP_SERVERS, row["topic_name"], row["consumer_group_name"])] = {
+                "cluster": None,
+                "bootstrap_servers": KAFKA_BOOTSTRAP_SERVERS,
+                "topic_name": row["topic_name"],
+                "consumer_group_name": row["consumer_group_name"],
+                "scaled_object": None,
+                "lag_threshold": None
+            }
+        # a ScaledObject for the same pair wins, it knows the cluster and the threshold
+        targets.update(self._scaled_object_targets)
+        return targets
+
+    async def sample(self, target: dict) -> dict:
+        cluster_name, bootstrap_servers, topic = target["cluster"], target["bootstrap_servers"], target["topic_name"]
+        admin = await kafka_admins.get(cluster_name, bootstrap_servers)
+        consumer = await self._consumer(bootstrap_servers)
+
+        described = await admin.describe_topics([topic])
+        if not described or described[0]["error_code"] != 0:
+            raise RuntimeError(f"Topic {topic} not found")
+        partitions = [TopicPartition(topic, partition["partition"]) for partition in described[0]["partitions"]]
+
+        committed, end = await asyncio.gather(
+            admin.list_consumer_group_offsets(target["consumer_group_name"], partitions=partitions),
+            consumer.end_offsets(partitions)
+        )
+
+        per_partition = {}
+        for tp in sorted(partitions, key=lambda tp: tp.partition):
+            offset = committed.get(tp)
+            committed_offset = offset.offset if offset is not None and offset.offset >= 0 else None
+            per_partition[tp.partition] = {
+                "committed": committed_offset,
+                "end": end[tp],
+                # no commit yet: the group hasn't consumed this partition, so its lag is unknown rather than 0
+                "lag": max(end[tp] - committed_offset, 0) if committed_offset is not None else None
+            }
+
+        return {
+            "ts": time.time(),
+            "total_lag": sum(partition["lag"] for partition in per_partition.values() if partition["lag"] is not None),
+            "uncommitted_partitions": sum(1 for partition in per_partition.values() if partition["committed"] is None),
+            "partitions": per_partition
+        }
 
-        create_topic_cmd = [
-            "kubectl", "run", "-ti", "--image=gcr.io/google_containers/kubernetes-kafka:1.0-10.2.1",
-            "createtopic", "--restart=Never", "--rm", "--",
-            "kafka-topics.sh", "--create", "--topic", topic_name,
-            "--zookeeper", zookeeper_service, "--partitions", "1", "--replication-factor", "1"
+    async def _sample_target(self, key: tuple, target: dict):
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = LagSeries(target)
+        series.target = target
+
+        try:
+            series.add(await asyncio.wait_for(self.sample(target), LAG_SAMPLE_INTERVAL))
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            if error != series.error:
+                logger.error(f"Lag sample for {target['topic_name']}/{target['consumer_group_name']} failed: {error}")
+            series.error = error
+            await self._discard(target["cluster"], target["bootstrap_servers"])
+
+    async def _sample_brokers(self, targets: list):
+        for key, target in targets:
+            await self._sample_target(key, target)
+
+    async def _run(self):
+        while True:
+            started = time.monotonic()
+            try:
+                targets = await self._targets()
+                for key in [key for key in self.series if key not in targets]:
+                    del self.series[key]
+                # brokers in parallel; targets on one broker in turn, as they share its consumer
+                by_brokers = {}
+                for key, target in targets.items():
+                    by_brokers.setdefault(target["bootstrap_servers"], []).append((key, target))
+                await asyncio.gather(*[self._sample_brokers(group) for group in by_brokers.values()])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Lag monitor round failed: {str(e)}")
+            await asyncio.sleep(max(LAG_SAMPLE_INTERVAL - (time.monotonic() - started), 1.0))
+
+    def find(self, topic_name: str, consumer_group_name: str) -> list:
+        return [
+            series for (_, topic, group), series in self.series.items()
+            if topic == topic_name and group == consumer_group_name
         ]
 
-        result = subprocess.run(create_topic_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
 
-        if result.returncode != 0:
-            logger.error(f"Failed to create Kafka topic: {result.stderr}")
-            raise HTTPException(status_code=500, detail=f"Failed to create Kafka topic: {result.stderr}")
+lag_monitor = LagMonitor()
+
+
+# Latest lag and rates of every monitored (topic, consumer group)
+@app.get('/kafka-lag')
+async def get_kafka_lag():
+    if not LAG_MONITOR_ENABLED:
+        raise HTTPException(status_code=503, detail="Lag monitor is disabled")
+    return {"series": [series.summary() for series in lag_monitor.series.values()]}
 
-        logger.info(f"Created Kafka topic {topic_name}: {result.stdout}")
 
+# Lag history of one topic/consumer group, with per-partition detail for the latest sample
+@app.get('/kafka-lag/{topic_name}/{consumer_group_name}')
+async def get_kafka_lag_history(topic_name: str, consumer_group_name: str, since_seconds: float = 3600):
+    matches = lag_monitor.find(topic_name, consumer_group_name)
+    if not matches:
+        raise HTTPException(status_code=404, detail="Topic and consumer group are not monitored")
 
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "INSERT INTO kafka_topics (topic_name, consumer_group_name) VALUES (?, ?)",
-                (topic_name, consumer_group_name)
+    cutoff = time.time() - since_seconds
+    result = []
+    for series in matches:
+        samples = [sample for sample in series.samples if sample["ts"] >= cutoff]
+        result.append({
+            **series.summary(),
+            "partitions": series.samples[-1]["partitions"] if series.samples else {},
+            "history": [
+                {
+                    "ts": sample["ts"],
+                    "total_lag": sample["total_lag"],
+                    "consumption_rate": sample.get("consumption_rate"),
+                    "production_rate": sample.get("production_rate")
+                }
+                for sample in samples
+            ]
+        })
+    return {"series": result}
+
+
+SIMULATION_MAX_COMBINATIONS = int(os.getenv("SIMULATION_MAX_COMBINATIONS", "200000"))
+SIMULATION_MAX_STEPS = int(os.getenv("SIMULATION_MAX_STEPS", "86400"))
+# combinations x steps bounds the run time (roughly 10M per second), state floats the memory (8 bytes each)
+SIMULATION_MAX_LANE_STEPS = int(os.getenv("SIMULATION_MAX_LANE_STEPS", "100000000"))
+SIMULATION_MAX_STATE_FLOATS = int(os.getenv("SIMULATION_MAX_STATE_FLOATS", "25000000"))
+
+
+def sweep_errors(sweep: dict) -> list:
+    """The limits /deploy applies, checked on every swept value; settings not swept keep the DeploymentData defaults."""
+    if any(not values for values in sweep.values()):
+        return ["sweep lists must not be empty"]
+    fractional = sorted(name for name, values in sweep.items() if not all(float(value).is_integer() for value in values))
+    if fractional:
+        return [f"sweep values must be whole numbers: {', '.join(fractional)}"]
+    values = {name: sweep.get(name, [DeploymentData.__fields__[name].default]) for name in SCALING_FIELDS}
+    return scaling_limit_errors(values)
+
+
+# Sweep ScaledObject settings offline against an arrival profile; "recommended" can go straight into /deploy
+@app.post('/simulate/keda')
+async def simulate_keda(request: KedaSimulationRequest):
+    if request.per_pod_throughput <= 0 or request.resolution_seconds <= 0:
+        raise HTTPException(status_code=400, detail="per_pod_throughput and resolution_seconds must be positive")
+    if request.pod_startup_seconds < 0:
+        raise HTTPException(status_code=400, detail="pod_startup_seconds must not be negative")
+    errors = sweep_errors(request.sweep)
+    if errors:
+        raise HTTPException(status_code=400, detail="; ".join(errors))
+
+    initial_backlog = request.initial_backlog or 0
+    try:
+        if request.topic_name:
+            matches = lag_monitor.find(request.topic_name, request.consumer_group_name)
+            samples = [sample for series in matches[:1] for sample in series.samples]
+            if len(samples) < 2:
+                raise HTTPException(status_code=404, detail="Not enough lag history recorded for this topic and consumer group")
+            rates = keda_simulator.profile_from_samples(
+                [sample["ts"] for sample in samples],
+                [sample.get("production_rate") or 0 for sample in samples],
+                request.resolution_seconds
+            )
+            if request.initial_backlog is None:
+                initial_backlog = samples[0]["total_lag"]
+        else:
+            rates = keda_simulator.synthetic_profile(
+                request.profile, request.rate, request.duration_seconds, request.resolution_seconds,
+                ramp_to_rate=request.ramp_to_rate, ramp_seconds=request.ramp_seconds,
+                step_rate=request.step_rate, step_interval_seconds=request.step_seconds,
+                burst_rate=request.burst_rate, burst_seconds=request.burst_seconds,
+                burst_interval_seconds=request.burst_interval_seconds
             )
-            conn.commit()
+        grid = keda_simulator.parameter_grid(**request.sweep)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    combinations = len(grid["lag_threshold"])
+    if combinations == 0:
+        raise HTTPException(status_code=400, detail="The sweep has no valid combination")
+    state_floats = keda_simulator.state_floats(grid, request.pod_startup_seconds, request.resolution_seconds)
+    if (combinations > SIMULATION_MAX_COMBINATIONS or len(rates) > SIMULATION_MAX_STEPS
+            or combinations * len(rates) > SIMULATION_MAX_LANE_STEPS or state_floats > SIMULATION_MAX_STATE_FLOATS):
+        raise HTTPException(status_code=400, detail=(
+            f"Sweep too large ({combinations} combinations x {len(rates)} steps): "
+            "reduce the parameter lists, the duration, the stabilization windows and policy periods or the resolution"
+        ))
+
+    def run():
+        started = time.perf_counter()
+        results = keda_simulator.simulate(
+            rates, grid, request.per_pod_throughput,
+            partitions=request.partitions,
+            pod_startup_seconds=request.pod_startup_seconds,
+            step_seconds=request.resolution_seconds,
+            initial_backlog=initial_backlog
+        )
+        ranked = keda_simulator.rank(grid, results, request.max_backlog, request.max_drain_seconds, request.top)
+        return ranked, time.perf_counter() - started
+
+    ranked, elapsed = await run_blocking(run)
+    return {
+        "combinations": combinations,
+        "steps": len(rates),
+        "elapsed_seconds": round(elapsed, 3),
+        "ranked": ranked,
+        "recommended": keda_simulator.recommend(ranked)
+    }
+
+
+
+@functools.lru_cache(maxsize=256)
+def _render_application_manifests(spec_json: str) -> str:
+    spec = json.loads(spec_json)
+    deployment_name = spec["deployment_name"]
+    labels = {"app": deployment_name, MANAGED_BY_LABEL: FIELD_MANAGER}
+
+    deployment = {
+        "apiVersion": "apps/v1",
+        "kind": "Deployment",
+        "metadata": {"name": deployment_name, "namespace": "default", "labels": labels},
+        "spec": {
+            "replicas": 1,
+            "selector": {"matchLabels": {"app": deployment_name}},
+            "template": {
+                "metadata": {"labels": {"app": deployment_name}},
+                "spec": {
+                    "containers": [{
+                        "name": spec["docker_image"].split('/')[-1],
+                        "image": f"{spec['docker_image']}:{spec['docker_tag']}",
+                        "resources": {
+                            "requests": {"cpu": spec["cpu_requests"], "memory": f"{spec['memory_requests']}Mi"},
+                            "limits": {"cpu": spec["cpu_limits"], "memory": f"{spec['memory_limits']}Mi"}
+                        },
+                        "ports": [{"containerPort": port} for port in spec["target_ports"]]
+                    }]
+                }
+            }
+        }
+    }
+    service = {
+        "apiVersion": "v1",
+        "kind": "Service",
+        "metadata": {"name": f"{deployment_name}-service", "namespace": "default", "labels": labels},
+        "spec": {
+            "selector": {"app": deployment_name},
+            "ports": [{"protocol": "TCP", "port": spec["ports"][0], "targetPort": spec["target_ports"][0]}],
+            "type": "LoadBalancer"
+        }
+    }
+    scaled_object = {
+        "apiVersion": "keda.sh/v1alpha1",
+        "kind": "ScaledObject",
+        "metadata": {"name": f"{deployment_name}-scaledobject", "namespace": "default", "labels": labels},
+        "spec": {
+            "scaleTargetRef": {"kind": "Deployment", "name": deployment_name},
+            "minReplicaCount": spec["min_replica_count"],
+            "maxReplicaCount": spec["max_replica_count"],
+            "pollingInterval": spec["polling_interval"],
+            "cooldownPeriod": spec["cooldown_period"],
+            "advanced": {
+                "horizontalPodAutoscalerConfig": {
+                    "behavior": {
+                        "scaleUp": {
+                            "stabilizationWindowSeconds": spec["scale_up_stabilization_seconds"],
+                            "selectPolicy": "Max",
+                            "policies": [
+                                {"type": "Pods", "value": spec["scale_up_pods"], "periodSeconds": spec["scale_up_period_seconds"]},
+                                {"type": "Percent", "value": spec["scale_up_percent"], "periodSeconds": spec["scale_up_period_seconds"]}
+                            ]
+                        },
+                        "scaleDown": {
+                            "stabilizationWindowSeconds": spec["scale_down_stabilization_seconds"],
+                            "policies": [
+                                {"type": "Percent", "value": spec["scale_down_percent"], "periodSeconds": spec["scale_down_period_seconds"]}
+                            ]
+                        }
+                    }
+                }
+            },
+            "triggers": [{
+                "type": "kafka",
+                "metadata": {
+                    "bootstrapServers": "kafka.default.svc.cluster.local:9092",
+                    "topic": spec["kafka_topic"],
+                    "consumerGroup": spec["consumer_group_name"],
+                    "lagThreshold": str(spec["lag_threshold"]),
+                    "activationLagThreshold": str(spec["activation_lag_threshold"]),
+                    "offsetResetPolicy": spec["offset_reset_policy"],
+                    # replicas are capped at the partition count before applying, see fit_to_partitions
+                    "allowIdleConsumers": "false"
+                }
+            }]
+        }
+    }
+    return json.dumps([stamp_content_hash(manifest) for manifest in (deployment, service, scaled_object)])
+
+
+# only these fields shape the manifests; the rest of DeploymentData doesn't belong in the cache key
+MANIFEST_FIELDS = {
+    "deployment_name", "docker_image", "docker_tag", "cpu_requests", "memory_requests", "cpu_limits", "memory_limits",
+    "ports", "target_ports", "kafka_topic", "consumer_group_name",
+    "min_replica_count", "max_replica_count", "lag_threshold", "activation_lag_threshold", "polling_interval",
+    "cooldown_period", "offset_reset_policy",
+    "scale_up_stabilization_seconds", "scale_up_pods", "scale_up_percent", "scale_up_period_seconds",
+    "scale_down_stabilization_seconds", "scale_down_percent", "scale_down_period_seconds",
+}
+
+
+# every ScaledObject/HPA setting scaling_limit_errors() checks; all are whole numbers
+SCALING_FIELDS = (
+    "min_replica_count", "max_replica_count", "lag_threshold", "activation_lag_threshold",
+    "polling_interval", "cooldown_period", "scale_up_stabilization_seconds", "scale_up_pods",
+    "scale_up_percent", "scale_up_period_seconds", "scale_down_stabilization_seconds",
+    "scale_down_percent", "scale_down_period_seconds",
+)
 
-        return {"message": f"Created topic {topic_name} and consumer group {consumer_group_name}"}
 
-    except Exception as e:
-        logger.error(f"Error creating Kafka topic/consumer group: {e}")
-        raise HTTPException(status_code=500, detail=f"Error creating Kafka topic/consumer group: {str(e)}")
+def scaling_limit_errors(values: dict) -> list:
+    """Range checks on scaling settings; values maps each of SCALING_FIELDS to every value it takes."""
+    def low(name):
+        return min(values[name])
+
+    def high(name):
+        return max(values[name])
+
+    errors = []
+    if low("min_replica_count") < 0:
+        errors.append("min_replica_count must not be negative")
+    if low("lag_threshold") <= 0 or low("activation_lag_threshold") < 0:
+        errors.append("lag_threshold must be positive and activation_lag_threshold not negative")
+    if low("polling_interval") <= 0 or low("cooldown_period") < 0:
+        errors.append("polling_interval must be positive and cooldown_period not negative")
+    if min(low("scale_up_pods"), low("scale_up_percent"), low("scale_down_percent")) <= 0:
+        errors.append("scale-up and scale-down policy values must be positive")
+    # HPA limits: periods up to 30 minutes, stabilization windows up to one hour
+    if not (0 < low("scale_up_period_seconds") and high("scale_up_period_seconds") <= 1800
+            and 0 < low("scale_down_period_seconds") and high("scale_down_period_seconds") <= 1800):
+        errors.append("policy periods must be between 1 and 1800 seconds")
+    if not (0 <= low("scale_up_stabilization_seconds") and high("scale_up_stabilization_seconds") <= 3600
+            and 0 <= low("scale_down_stabilization_seconds") and high("scale_down_stabilization_seconds") <= 3600):
+        errors.append("stabilization windows must be between 0 and 3600 seconds")
+    return errors
+
+
+def scaling_errors(deployment_data: DeploymentData) -> list:
+    errors = []
+    if not deployment_data.ports or not deployment_data.target_ports:
+        errors.append("ports and target_ports must not be empty")
+    if deployment_data.max_replica_count < max(deployment_data.min_replica_count, 1):
+        errors.append("max_replica_count must be at least 1 and not below min_replica_count")
+    errors += scaling_limit_errors({name: [getattr(deployment_data, name)] for name in SCALING_FIELDS})
+    if deployment_data.offset_reset_policy not in ("latest", "earliest"):
+        errors.append("offset_reset_policy must be latest or earliest")
+    return errors
+
+
+def render_application_manifests(deployment_data: DeploymentData) -> list:
+    """Deployment, Service and ScaledObject for an app, each stamped with its content hash.
+
+    Rendering is memoized on the spec; callers get fresh copies they may mutate.
+    """
+    errors = scaling_errors(deployment_data)
+    if errors:
+        raise HTTPException(status_code=400, detail="; ".join(errors))
 
+    return json.loads(_render_application_manifests(deployment_data.json(include=MANIFEST_FIELDS)))
 
 
-# API to deploy an application and create KEDA scaled object
-@app.post('/deploy/{cluster}')
-async def deploy_application(cluster: str, deployment_data: DeploymentData):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cluster_data = cursor.execute("SELECT * FROM clusters WHERE cluster_name = ?", (cluster,)).fetchone()
+async def topic_partition_counts(cluster: str, topic_names: list, bootstrap_servers: Optional[str], port_forward: bool) -> Optional[dict]:
+    """Partitions per existing topic, or None when the brokers can't be reached.
 
-    if not cluster_data:
-        conn.close()
-        raise HTTPException(status_code=404, detail="Cluster not found")
+    The lookup only tunes the ScaledObject, so an unreachable broker (the
+    default KAFKA_BOOTSTRAP_SERVERS rarely resolves from outside the cluster)
+    never fails a deploy.
+    """
+    try:
+        admin, bootstrap_servers = await get_kafka_admin(cluster, bootstrap_servers, port_forward)
+    except HTTPException as e:
+        logger.warning(f"Skipping partition lookup for {cluster}: {e.detail}")
+        return None
+    try:
+        topics = await admin.describe_topics(list(topic_names))
+    except Exception as e:
+        await kafka_admins.discard(cluster, bootstrap_servers)
+        logger.warning(f"Skipping partition lookup for {cluster}, describing topics on {bootstrap_servers} failed: {str(e)}")
+        return None
+    return {topic["topic"]: len(topic["partitions"]) for topic in topics if topic["error_code"] == 0}
 
-    kubeconfig_file = create_eks_kubeconfig(cluster_data['cluster_name'], cluster_data['region'], cluster_data['access_key'], cluster_data['secret_key'])
-    os.environ["KUBECONFIG"] = kubeconfig_file
 
-    service_name = f"{deployment_data.deployment_name}-service"
+def fit_to_partitions(deployment_data: DeploymentData, partition_counts: Optional[dict]) -> tuple:
+    """Cap replica counts at the topic's partitions; a consumer beyond that would sit idle.
 
-    deployment_yaml = f"""
-apiVersion: apps/v1
-kind: Deployment
-metadata:
-  name: {deployment_data.deployment_name}
-  namespace: default
-spec:
-  replicas: 1
-  selector:
-    matchLabels:
-      app: {deployment_data.deployment_name}
-  template:
-    metadata:
-      labels:
-        app: {deployment_data.deployment_name}
-    spec:
-      containers:
-      - name: {deployment_data.docker_image.split('/')[-1]}
-        image: {deployment_data.docker_image}:{deployment_data.docker_tag}
-        resources:
-          requests:
-            cpu: {deployment_data.cpu_requests}
-            memory: {deployment_data.memory_requests}Mi
-          limits:
-            cpu: {deployment_data.cpu_limits}
-            memory: {deployment_data.memory_limits}Mi
-        ports:
-        {''.join([f"- containerPort: {port}\n" for port in deployment_data.target_ports])}
----
-apiVersion: v1
-kind: Service
-metadata:
-  name: {service_name}
-  namespace: default
-spec:
-  selector:
-    app: {deployment_data.deployment_name}
-  ports:
-    - protocol: TCP
-      port: {deployment_data.ports[0]}         
-      targetPort: {deployment_data.target_ports[0]}     
-  type: LoadBalancer
----
-apiVersion: keda.sh/v1alpha1
-kind: ScaledObject
-metadata:
-  name: {deployment_data.deployment_name}-scaledobject
-  namespace: default
-spec:
-  scaleTargetRef:
-    kind: Deployment
-    name: {deployment_data.deployment_name}
-  minReplicaCount: 1
-  maxReplicaCount: 10
-  triggers:
-    - type: kafka
-      metadata:
-        bootstrapServers: "kafka.default.svc.cluster.local:9092"
-        topic: {deployment_data.kafka_topic}
-        consumerGroup: {deployment_data.consumer_group_name}
-        lagThreshold: "10"
+    Returns the (possibly adjusted) data and a list of warnings. Without a
+    partition count (brokers unreachable, or the topic unknown to them) the
+    requested counts are kept. A missing topic is only a 400 when the caller
+    named the brokers, otherwise they may simply not be this cluster's.
+    """
+    topic = deployment_data.kafka_topic
+    if partition_counts is None:
+        return deployment_data, [f"Partitions of {topic} could not be looked up; replica counts left as requested"]
+    partitions = partition_counts.get(topic)
+    if partitions is None:
+        if deployment_data.bootstrap_servers or deployment_data.port_forward:
+            raise HTTPException(status_code=400, detail=f"Kafka topic {topic} does not exist")
+        return deployment_data, [f"Kafka topic {topic} was not found on {KAFKA_BOOTSTRAP_SERVERS}; replica counts left as requested"]
+
+    warnings = []
+    update = {}
+    if deployment_data.max_replica_count > partitions:
+        warnings.append(
+            f"max_replica_count {deployment_data.max_replica_count} capped at the {partitions} partition(s) of {topic}"
+        )
+        update["max_replica_count"] = partitions
+    if deployment_data.min_replica_count > partitions:
+        warnings.append(f"min_replica_count {deployment_data.min_replica_count} capped at {partitions}")
+        update["min_replica_count"] = partitions
+    return deployment_data.copy(update=update), warnings
+
+
+UPSERT_DEPLOYMENT_SQL = """
+    INSERT INTO deployments (cluster_name, deployment_name, service_name)
+    VALUES (?, ?, ?)
+    ON CONFLICT(deployment_name) DO UPDATE SET
+        cluster_name = excluded.cluster_name,
+        service_name = excluded.service_name
 """
-    deployment_file = f"/tmp/deployment-{deployment_data.deployment_name}.yaml"
-    with open(deployment_file, "w") as f:
-        f.write(deployment_yaml)
 
-    try:
-        result = subprocess.run(["kubectl", "apply", "-f", deployment_file], check=True, capture_output=True, text=True)
-        logger.info(f"Kubectl apply output: {result.stdout}")
 
-        cursor.execute(
-            """
-            INSERT INTO deployments (cluster_name, deployment_name, service_name)
-            VALUES (?, ?, ?)
-            """,
-            (
-                cluster,
-                deployment_data.deployment_name,
-                service_name
-            )
-        )
-        conn.commit()
+# API to deploy an application and create KEDA scaled object; validated here, applied by a background job
+@app.post('/deploy/{cluster}', status_code=202)
+async def deploy_application(cluster: str, deployment_data: DeploymentData):
+    await run_blocking(get_cluster_data, cluster)
 
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Error running kubectl apply: {e.stderr}")
-        conn.close()
-        raise HTTPException(status_code=500, detail=f"Failed to apply Kubernetes resources: {e.stderr}")
+    errors = scaling_errors(deployment_data)
+    if errors:
+        raise HTTPException(status_code=400, detail="; ".join(errors))
+    return await job_queue.submit("deploy", cluster, deployment_data.json())
 
-    conn.close()
-    return {"message": "Deployment created successfully"}
 
+@job_queue.handler("deploy")
+async def run_deploy_application(job_id: str, cluster: str, request: Optional[str]) -> dict:
+    deployment_data = DeploymentData.parse_raw(request)
+    cluster_data = await run_blocking(get_cluster_data, cluster)
 
-logger = logging.getLogger(__name__)
+    service_name = f"{deployment_data.deployment_name}-service"
+
+    partition_counts = await topic_partition_counts(
+        cluster, [deployment_data.kafka_topic], deployment_data.bootstrap_servers, deployment_data.port_forward
+    )
+    deployment_data, warnings = fit_to_partitions(deployment_data, partition_counts)
+    for warning in warnings:
+        await job_queue.log(job_id, f"Warning: {warning}")
+
+    await job_queue.log(job_id, f"Applying manifests for {deployment_data.deployment_name}")
+    results = await manifest_applier.apply(cluster_data, render_application_manifests(deployment_data))
+    logger.info(f"Apply results for {deployment_data.deployment_name}: {results}")
+    for result in results:
+        await job_queue.log(job_id, f"{result['kind']} {result['name']}: {result['status']}")
+    if any(result["status"] == "failed" for result in results):
+        raise HTTPException(status_code=500, detail={"message": "Failed to apply Kubernetes resources", "results": results})
+
+    # re-deploying with new settings is expected, so the row is an upsert
+    def insert_deployment():
+        db.execute(UPSERT_DEPLOYMENT_SQL, (cluster, deployment_data.deployment_name, service_name))
+
+    await run_blocking(insert_deployment)
+    response_cache.invalidate("deployments", cluster)
+    return {"message": "Deployment created successfully", "results": results, "warnings": warnings}
+
+
+DEPLOY_BATCH_CONCURRENCY = int(os.getenv("DEPLOY_BATCH_CONCURRENCY", "4"))
+# a batch never gets more than a quarter of the blocking pool, whatever it asks for
+DEPLOY_BATCH_MAX_CONCURRENCY = max(1, BLOCKING_POOL_SIZE // 4)
+
+
+# Bulk variant of /deploy: one client for the cluster, items applied concurrently, rows written in one transaction.
+# It runs in the request rather than on the job queue, so it isn't ordered against queued /deploy jobs for the
+# same cluster; don't deploy the same name both ways at once.
+@app.post('/deploy/{cluster}/batch')
+async def deploy_applications_batch(cluster: str, request: DeploymentBatchRequest):
+    cluster_data = await run_blocking(get_cluster_data, cluster)
+
+    if not request.deployments:
+        raise HTTPException(status_code=400, detail="No deployments given")
+    names = [deployment_data.deployment_name for deployment_data in request.deployments]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise HTTPException(status_code=400, detail=f"Duplicate deployment names: {', '.join(duplicates)}")
+
+    # every item also needs one of the cluster's slots, so more than CLUSTER_CONCURRENCY would only queue
+    concurrency = max(1, min(request.concurrency or DEPLOY_BATCH_CONCURRENCY, DEPLOY_BATCH_MAX_CONCURRENCY, CLUSTER_CONCURRENCY))
+    semaphore = asyncio.Semaphore(concurrency)
+    started = time.perf_counter()
+
+    try:
+        await run_blocking(kube_clients.get, cluster_data)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to build Kubernetes client: {str(e)}")
+
+    # one describe per broker setting for every topic the batch consumes from
+    partition_counts = {}
+    by_brokers = {}
+    for deployment_data in request.deployments:
+        by_brokers.setdefault((deployment_data.bootstrap_servers, deployment_data.port_forward), set()).add(deployment_data.kafka_topic)
+    for (bootstrap_servers, port_forward), topic_names in by_brokers.items():
+        partition_counts[(bootstrap_servers, port_forward)] = await topic_partition_counts(
+            cluster, topic_names, bootstrap_servers, port_forward
+        )
 
+    # items are bounded by the batch's concurrency and, like every other write, by the cluster's slot;
+    # an item's objects go out together, as they do for a single /deploy
+    async def deploy_item(deployment_data: DeploymentData) -> dict:
+        item = {"deployment_name": deployment_data.deployment_name}
+        async with semaphore:
+            item_started = time.perf_counter()
+            try:
+                deployment_data, warnings = fit_to_partitions(
+                    deployment_data, partition_counts[(deployment_data.bootstrap_servers, deployment_data.port_forward)]
+                )
+                item["warnings"] = warnings
+                manifests = render_application_manifests(deployment_data)
+            except HTTPException as e:
+                item.update(status="failed", error=e.detail, results=[])
+            else:
+                results = await manifest_applier.apply(cluster_data, manifests)
+                if any(result["status"] == "failed" for result in results):
+                    status = "failed"
+                elif all(result["status"] == "unchanged" for result in results):
+                    status = "unchanged"
+                else:
+                    status = "deployed"
+                item.update(status=status, results=results)
+            item["elapsed_ms"] = round((time.perf_counter() - item_started) * 1000, 1)
+        return item
+
+    items = await asyncio.gather(*[deploy_item(deployment_data) for deployment_data in request.deployments])
+
+    succeeded = [item["deployment_name"] for item in items if item["status"] != "failed"]
+
+    def upsert_deployments():
+        db.execute_many(UPSERT_DEPLOYMENT_SQL, [(cluster, name, f"{name}-service") for name in succeeded])
+
+    if succeeded:
+        await run_blocking(upsert_deployments)
+        response_cache.invalidate("deployments", cluster)
+
+    failed = len(items) - len(succeeded)
+    if failed:
+        logger.error(f"Batch deploy to {cluster}: {failed} of {len(items)} deployments failed")
+
+    return {
+        "deployed": len(succeeded),
+        "failed": failed,
+        "concurrency": concurrency,
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+        "deployments": list(items)
+    }
 
 
 @app.get('/kafka-topics')
-async def get_kafka_topics_consumer_groups():
-    try:
+async def get_kafka_topics_consumer_groups(request: Request):
+    def fetch_topics():
+        return db.fetch_all("SELECT topic_name, consumer_group_name FROM kafka_topics")
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
+    async def build():
+        try:
+            topics = await run_blocking(fetch_topics)
 
-        topics = cursor.execute("SELECT topic_name, consumer_group_name FROM kafka_topics").fetchall()
-        conn.close()
-        
-        if not topics:
-            raise HTTPException(status_code=404, detail="No Kafka topics or consumer groups found")
+            if not topics:
+                raise HTTPException(status_code=404, detail="No Kafka topics or consumer groups found")
 
-        return [{"topic_name": row["topic_name"], "consumer_group_name": row["consumer_group_name"]} for row in topics]
-    
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error retrieving Kafka topics/consumer groups: {str(e)}")
+            return [{"topic_name": row["topic_name"], "consumer_group_name": row["consumer_group_name"]} for row in topics]
+
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error retrieving Kafka topics/consumer groups: {str(e)}")
+
+    return await response_cache.respond(request, ("kafka_topics",), build)
     
-@app.post('/install-keda/{cluster}')
+@app.post('/install-keda/{cluster}', status_code=202)
 async def install_keda(cluster: str):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cluster_data = cursor.execute("SELECT * FROM clusters WHERE cluster_name = ?", (cluster,)).fetchone()
-    conn.close()
+    await run_blocking(get_cluster_data, cluster)
+    return await job_queue.submit("install_keda", cluster)
 
-    if not cluster_data:
-        raise HTTPException(status_code=404, detail="Cluster not found")
 
-    kubeconfig_file = create_eks_kubeconfig(cluster_data['cluster_name'], cluster_data['region'], cluster_data['access_key'], cluster_data['secret_key'])
-    os.environ["KUBECONFIG"] = kubeconfig_file
+@job_queue.handler("install_keda")
+async def run_install_keda(job_id: str, cluster: str, request: Optional[str]) -> dict:
+    cluster_data = await run_blocking(get_cluster_data, cluster)
 
-    keda_installed = subprocess.run(["helm", "list", "-n", "keda"], capture_output=True, text=True)
-    if "keda" in keda_installed.stdout:
-        return {"message": "KEDA is already installed"}
+    async with eks_kubeconfig_file(cluster_data) as kubeconfig_file, cluster_slot(cluster):
+        await job_queue.log(job_id, "Checking for an existing KEDA release")
+        keda_installed = await run_command(["helm", "--kubeconfig", kubeconfig_file, "list", "-n", "keda"], cluster=cluster)
+        if "keda" in keda_installed.stdout:
+            return {"message": "KEDA is already installed"}
 
-    install_command = ["helm", "install", "keda", "kedacore/keda", "--namespace", "keda", "--create-namespace"]
-    result = subprocess.run(install_command, capture_output=True, text=True)
+        await job_queue.log(job_id, "Installing the kedacore/keda chart")
+        install_command = ["helm", "--kubeconfig", kubeconfig_file, "install", "keda", "kedacore/keda", "--namespace", "keda", "--create-namespace"]
+        result = await run_command(install_command, cluster=cluster)
 
-    if result.returncode == 0:
-        return {"message": "KEDA installed successfully"}
-    else:
-        return {"error": "Failed to install KEDA", "details": result.stderr}
+    if result.stdout:
+        await job_queue.log(job_id, result.stdout.strip())
+    if result.returncode != 0:
+        raise HTTPException(status_code=500, detail={"message": "Failed to install KEDA", "details": result.stderr})
+    return {"message": "KEDA installed successfully"}
     
 
 @app.get('/deployments/{cluster}')
-async def get_deployment_names(cluster: str):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    try:
-        deployments = cursor.execute(
+async def get_deployment_names(cluster: str, request: Request):
+    def fetch_deployments():
+        return db.fetch_all(
             "SELECT deployment_name FROM deployments WHERE cluster_name = ?",
             (cluster,)
-        ).fetchall()
+        )
+
+    async def build():
+        deployments = await run_blocking(fetch_deployments)
 
         if not deployments:
             raise HTTPException(status_code=404, detail="No deployments found for the specified cluster")
 
         deployment_names = [row["deployment_name"] for row in deployments]
-    finally:
-        conn.close()
 
-    return {"deployments": deployment_names}
+        return {"deployments": deployment_names}
+
+    return await response_cache.respond(request, ("deployments", cluster), build)
+
+TEARDOWN_NAMESPACE = "default"
+TEARDOWN_POLL_SECONDS = float(os.getenv("TEARDOWN_POLL_SECONDS", "2"))
+
+
+async def wait_for_pods_gone(cluster_data, deployment_name: str, timeout_seconds: float) -> bool:
+    """Poll until no pod labelled app=<deployment_name> is left, or the timeout passes.
+
+    Each check is one short list call; the waiting happens on the event loop,
+    so many concurrent teardowns never hold blocking pool threads.
+    """
+    v1 = client.CoreV1Api(await run_blocking(kube_clients.get, cluster_data))
+    label_selector = f"app={deployment_name}"
+    deadline = time.monotonic() + timeout_seconds
+
+    while True:
+        pods = await run_blocking(v1.list_namespaced_pod, TEARDOWN_NAMESPACE, label_selector=label_selector, limit=1)
+        if not pods.items:
+            return True
+        if time.monotonic() + TEARDOWN_POLL_SECONDS > deadline:
+            return False
+        await asyncio.sleep(TEARDOWN_POLL_SECONDS)
+
+
+async def teardown_application(cluster_data, deployment_name: str, service_name: str,
+                               wait: bool = False, wait_timeout_seconds: float = 120) -> dict:
+    """Delete an app's Deployment, Service and ScaledObject concurrently, then drop its row.
+
+    Objects that are already gone count as deleted. The row is only removed once
+    every delete succeeded, so a failed teardown can simply be retried.
+    """
+    cluster_name = cluster_data['cluster_name']
+    started = time.perf_counter()
+    api_client = await run_blocking(kube_clients.get, cluster_data)
+
+    v1 = client.CoreV1Api(api_client)
+    apps_v1 = client.AppsV1Api(api_client)
+    custom_objects_api = client.CustomObjectsApi(api_client)
+
+    async def delete(kind: str, name: str, func, **kwargs) -> dict:
+        result = {"kind": kind, "name": name}
+        try:
+            await run_blocking(func, name=name, namespace=TEARDOWN_NAMESPACE, **kwargs)
+            result["status"] = "deleted"
+        except client.exceptions.ApiException as e:
+            if e.status == 404:
+                result["status"] = "not_found"
+            else:
+                await run_blocking(invalidate_on_stale_cluster, cluster_name, e)
+                result.update(status="failed", error=f"{e.status} {e.reason}")
+        except Exception as e:
+            result.update(status="failed", error=str(e))
+        return result
+
+    async with cluster_slot(cluster_name):
+        results = list(await asyncio.gather(
+            delete("Deployment", deployment_name, apps_v1.delete_namespaced_deployment),
+            delete("Service", service_name, v1.delete_namespaced_service),
+            delete(
+                "ScaledObject", f"{deployment_name}-scaledobject",
+                custom_objects_api.delete_namespaced_custom_object,
+                group="keda.sh", version="v1alpha1", plural="scaledobjects"
+            )
+        ))
+    manifest_applier.forget(cluster_name)
+
+    teardown = {"deployment_name": deployment_name, "results": results}
+    if any(result["status"] == "failed" for result in results):
+        teardown["status"] = "failed"
+    else:
+        def delete_row():
+            db.execute(
+                "DELETE FROM deployments WHERE cluster_name = ? AND deployment_name = ?",
+                (cluster_name, deployment_name)
+            )
+
+        await run_blocking(delete_row)
+        response_cache.invalidate("deployments", cluster_name)
+        teardown["status"] = "deleted"
+
+        if wait:
+            try:
+                teardown["pods_gone"] = await wait_for_pods_gone(cluster_data, deployment_name, wait_timeout_seconds)
+            except Exception as e:
+                logger.error(f"Failed waiting for pods of {deployment_name} to terminate: {str(e)}")
+                teardown["pods_gone"] = False
+
+    teardown["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return teardown
+
 
 @app.delete('/delete-deployment/{cluster_name}/{deployment_name}')
-async def delete_deployment(cluster_name: str, deployment_name: str):
-    conn = get_db_connection()
-    cursor = conn.cursor()
+async def delete_deployment(cluster_name: str, deployment_name: str, wait: bool = False, wait_timeout_seconds: int = 120):
+    cluster_data = await run_blocking(get_cluster_data, cluster_name)
 
-    cluster_data = cursor.execute("SELECT * FROM clusters WHERE cluster_name = ?", (cluster_name,)).fetchone()
-    if not cluster_data:
-        raise HTTPException(status_code=404, detail="Cluster not found")
-    
-    service_name = cursor.execute("SELECT service_name FROM deployments WHERE deployment_name = ?", (deployment_name,)).fetchone()
+    def fetch_service_name():
+        return db.fetch_one("SELECT service_name FROM deployments WHERE deployment_name = ?", (deployment_name,))
+
+    service_name = await run_blocking(fetch_service_name)
     if not service_name:
         raise HTTPException(status_code=404, detail="Service not found")
 
-    conn.close()
-
-    try:
-        kubeconfig_file = create_eks_kubeconfig(
-            cluster_data['cluster_name'],
-            cluster_data['region'],
-            cluster_data['access_key'],
-            cluster_data['secret_key']
-        )
-        os.environ["KUBECONFIG"] = kubeconfig_file
-        config.load_kube_config(config_file=kubeconfig_file)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail="Failed to configure Kubernetes client: " + str(e))
+    teardown = await teardown_application(cluster_data, deployment_name, service_name[0], wait, wait_timeout_seconds)
+    if teardown["status"] == "failed":
+        raise HTTPException(status_code=500, detail={
+            "message": "Failed to delete deployment, service, or scaled object",
+            "results": teardown["results"]
+        })
 
-    v1 = client.CoreV1Api()
-    apps_v1 = client.AppsV1Api()
-    custom_objects_api = client.CustomObjectsApi()
+    return {
+        "message": f"Deployment {deployment_name} and its associated resources deleted successfully.",
+        **teardown
+    }
 
-    namespace = "default"
 
-    try:
+# Bulk teardown: explicit names, everything matching a label selector, or both
+@app.post('/delete-deployments/{cluster_name}')
+async def delete_deployments_batch(cluster_name: str, request: DeploymentDeleteBatchRequest):
+    cluster_data = await run_blocking(get_cluster_data, cluster_name)
 
-        apps_v1.delete_namespaced_deployment(name=deployment_name, namespace=namespace)
+    if not request.deployment_names and not request.label_selector:
+        raise HTTPException(status_code=400, detail="Give deployment_names, a label_selector, or both")
 
-        v1.delete_namespaced_service(name=service_name[0], namespace=namespace)
+    names = list(dict.fromkeys(request.deployment_names))
+    if request.label_selector:
+        def list_matching():
+            apps_v1 = client.AppsV1Api(kube_clients.get(cluster_data))
+            return apps_v1.list_namespaced_deployment(TEARDOWN_NAMESPACE, label_selector=request.label_selector).items
 
         try:
-            custom_objects_api.delete_namespaced_custom_object(
-                group="keda.sh",
-                version="v1alpha1",
-                namespace=namespace,
-                plural="scaledobjects",
-                name=deployment_name
-            )
+            matching = await run_blocking(list_matching)
         except client.exceptions.ApiException as e:
-            if e.status != 404:
-                raise e
+            await run_blocking(invalidate_on_stale_cluster, cluster_name, e)
+            raise HTTPException(status_code=500, detail=f"Failed to list deployments: {e.status} {e.reason}")
+        names.extend(deployment.metadata.name for deployment in matching if deployment.metadata.name not in names)
+
+    def fetch_service_names():
+        rows = db.fetch_all("SELECT deployment_name, service_name FROM deployments WHERE cluster_name = ?", (cluster_name,))
+        return {row[0]: row[1] for row in rows}
+
+    service_names = await run_blocking(fetch_service_names)
+    teardowns = await asyncio.gather(*[
+        teardown_application(
+            cluster_data, name, service_names.get(name, f"{name}-service"),
+            request.wait, request.wait_timeout_seconds
+        )
+        for name in names
+    ])
 
-    except client.exceptions.ApiException as e:
-        raise HTTPException(status_code=500, detail="Failed to delete deployment, service, or scaled object: " + str(e))
+    failed = sum(1 for teardown in teardowns if teardown["status"] == "failed")
+    return {"deleted": len(teardowns) - failed, "failed": failed, "deployments": list(teardowns)}
 
-    return {"message": f"Deployment {deployment_name} and its associated resources deleted successfully."}
 
-@app.get('/deployment-details/{cluster_name}/{deployment_name}')
-async def get_deployment_summary(cluster_name: str, deployment_name: str):
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def fetch_deployment_rows(cluster_name: str, deployment_name: str) -> tuple:
+    deployment = db.fetch_one("SELECT * FROM deployments WHERE deployment_name = ?", (deployment_name,))
+    if not deployment:
+        logger.error("Deployment %s not found in the database", deployment_name)
+        raise HTTPException(status_code=404, detail="Deployment not found")
 
-    logger.info("Fetching deployment summary for cluster: %s, deployment: %s", cluster_name, deployment_name)
+    cluster_data = db.fetch_one("SELECT * FROM clusters WHERE cluster_name = ?", (cluster_name,))
+    if not cluster_data:
+        logger.error("Cluster %s not found in the database", cluster_name)
+        raise HTTPException(status_code=404, detail="Cluster not found")
+    return deployment, cluster_data
 
-    try:
-        deployment = cursor.execute("SELECT * FROM deployments WHERE deployment_name = ?", (deployment_name,)).fetchone()
-        if not deployment:
-            logger.error("Deployment %s not found in the database", deployment_name)
-            raise HTTPException(status_code=404, detail="Deployment not found")
-
-        service_name = deployment["service_name"]
-        cluster_data = cursor.execute("SELECT * FROM clusters WHERE cluster_name = ?", (cluster_name,)).fetchone()
-        if not cluster_data:
-            logger.error("Cluster %s not found in the database", cluster_name)
-            raise HTTPException(status_code=404, detail="Cluster not found")
-    finally:
-        conn.close()
 
-    try:
-        kubeconfig_file = create_eks_kubeconfig(
-            cluster_data['cluster_name'],
-            cluster_data['region'],
-            cluster_data['access_key'],
-            cluster_data['secret_key']
-        )
-        os.environ["KUBECONFIG"] = kubeconfig_file
+POD_METRICS_TTL = float(os.getenv("POD_METRICS_TTL", "5"))
 
-        config.load_kube_config(config_file=kubeconfig_file)
-        v1 = client.CoreV1Api()
-        apps_v1 = client.AppsV1Api()
-        metrics_api = CustomObjectsApi()
 
-        deployment_obj = apps_v1.read_namespaced_deployment(name=deployment_name, namespace="default")
+def sum_container_usage(containers: list) -> dict:
+    cpu = sum(parse_quantity(container['usage'].get('cpu', '0')) for container in containers)
+    memory = sum(parse_quantity(container['usage'].get('memory', '0')) for container in containers)
+    return {"cpu": f"{int(cpu * 1000)}m", "memory": f"{int(memory / 1024)}Ki"}
 
-        pods = v1.list_namespaced_pod(namespace="default", label_selector=f"app={deployment_name}").items
-        pod_status_list = []
-        total_restarts = 0
-        running_pods = 0
 
-        metrics = metrics_api.list_namespaced_custom_object(
-            group="metrics.k8s.io",
-            version="v1beta1",
-            namespace="default",
-            plural="pods"
-        )
-        
-        pod_metrics = {item['metadata']['name']: item['containers'][0]['usage'] for item in metrics['items']}
-
-        for pod in pods:
-            restart_count = sum([cs.restart_count for cs in pod.status.container_statuses or []])
-            total_restarts += restart_count
-            if pod.status.phase == "Running":
-                running_pods += 1
-
-            cpu_usage = pod_metrics.get(pod.metadata.name, {}).get('cpu', 'N/A')
-            memory_usage = pod_metrics.get(pod.metadata.name, {}).get('memory', 'N/A')
-
-            pod_status_list.append({
-                "name": pod.metadata.name,
-                "status": pod.status.phase,
-                "restarts": restart_count,
-                "pod_ip": pod.status.pod_ip,
-                "cpu_usage": cpu_usage,
-                "memory_usage": memory_usage
-            })
+class PodMetricsCache:
+    """Short-lived metrics-server results per (cluster, namespace, label selector).
+
+    Concurrent callers for the same key share a single in-flight request, so N
+    dashboards on one deployment cost one metrics-server call per TTL.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._entries = {}
+        self._inflight = {}
+
+    async def get(self, cluster_data, namespace: str, label_selector: str) -> dict:
+        key = (cluster_data['cluster_name'], namespace, label_selector)
+
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl_seconds:
+            CACHE_REQUESTS.labels("pod_metrics", "hit").inc()
+            return entry[1]
+
+        CACHE_REQUESTS.labels("pod_metrics", "miss").inc()
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            inflight = self._inflight[key] = asyncio.ensure_future(self._fetch(cluster_data, namespace, label_selector))
+            inflight.add_done_callback(lambda _: self._inflight.pop(key, None))
+        pod_metrics = await asyncio.shield(inflight)
+
+        self._entries[key] = (time.monotonic(), pod_metrics)
+        return pod_metrics
+
+    def invalidate(self, cluster_name: str):
+        for key in [key for key in self._entries if key[0] == cluster_name]:
+            del self._entries[key]
+
+    async def _fetch(self, cluster_data, namespace: str, label_selector: str) -> dict:
+        async with cluster_slot(cluster_data['cluster_name']):
+            api_client = await run_blocking(kube_clients.get, cluster_data)
+            metrics_api = CustomObjectsApi(api_client)
+
+            metrics = await run_blocking(
+                metrics_api.list_namespaced_custom_object,
+                group="metrics.k8s.io",
+                version="v1beta1",
+                namespace=namespace,
+                plural="pods",
+                label_selector=label_selector
+            )
 
-        service = v1.read_namespaced_service(name=service_name, namespace="default")
+        return {item['metadata']['name']: sum_container_usage(item['containers']) for item in metrics['items']}
 
-        external_ip = None
-        if service.status.load_balancer and service.status.load_balancer.ingress:
-            external_ip = service.status.load_balancer.ingress[0].ip or service.status.load_balancer.ingress[0].hostname
 
+pod_metrics_cache = PodMetricsCache(ttl_seconds=POD_METRICS_TTL)
 
-        deployment_summary = {
-            "deployment_name": deployment_obj.metadata.name,
-            "replicas": deployment_obj.spec.replicas,
-            "pods_running": running_pods,
-            "total_restarts": total_restarts,
-            "service_name": service.metadata.name,
-            "external_ip": external_ip,
-            "pod_status_list": pod_status_list
-        }
 
-        return deployment_summary
+async def fetch_pod_metrics(cluster_data, deployment_name: str) -> dict:
+    return await pod_metrics_cache.get(cluster_data, "default", f"app={deployment_name}")
+
 
+@app.get('/deployment-details/{cluster_name}/{deployment_name}')
+async def get_deployment_summary(cluster_name: str, deployment_name: str):
+    logger.info("Fetching deployment summary for cluster: %s, deployment: %s", cluster_name, deployment_name)
+
+    deployment, cluster_data = await run_blocking(fetch_deployment_rows, cluster_name, deployment_name)
+    service_name = deployment["service_name"]
+
+    try:
+        cluster_informers = await informers.get(cluster_data, "deployments", "pods", "services")
+
+        deployment_obj = cluster_informers.deployments.store.get("default", deployment_name)
+        if deployment_obj is None:
+            raise HTTPException(status_code=404, detail=f"Deployment {deployment_name} not found in cluster")
+        service = cluster_informers.services.store.get("default", service_name)
+        if service is None:
+            raise HTTPException(status_code=404, detail=f"Service {service_name} not found in cluster")
+        pods = cluster_informers.pods.store.by_index("app", f"default/{deployment_name}")
+
+        pod_metrics = await fetch_pod_metrics(cluster_data, deployment_name)
+
+        return build_deployment_summary(deployment_obj, pods, service, pod_metrics)
+
+    except HTTPException:
+        raise
     except client.exceptions.ApiException as e:
         logger.error("Kubernetes API error: %s", str(e))
+        await run_blocking(invalidate_on_stale_cluster, cluster_name, e)
         raise HTTPException(status_code=500, detail=f"Kubernetes API error: {str(e)}")
     except Exception as e:
         logger.exception("Unexpected error occurred")
+        await run_blocking(invalidate_on_stale_cluster, cluster_name, e)
         raise HTTPException(status_code=500, detail=f"Failed to retrieve deployment summary: {str(e)}")
 
 
+DEPLOYMENT_FEED_KEEPALIVE = float(os.getenv("DEPLOYMENT_FEED_KEEPALIVE", "15"))
+DEPLOYMENT_FEED_METRICS_INTERVAL = float(os.getenv("DEPLOYMENT_FEED_METRICS_INTERVAL", "15"))
+DEPLOYMENT_FEED_QUEUE_SIZE = 64
+
+
+def diff_deployment_summaries(old: dict, new: dict) -> Optional[dict]:
+    fields = {key: value for key, value in new.items() if key != "pod_status_list" and old.get(key) != value}
+    old_pods = {pod["name"]: pod for pod in old.get("pod_status_list", [])}
+    new_pods = {pod["name"]: pod for pod in new.get("pod_status_list", [])}
+    pods_upserted = [pod for name, pod in new_pods.items() if old_pods.get(name) != pod]
+    pods_removed = [name for name in old_pods if name not in new_pods]
+
+    if not fields and not pods_upserted and not pods_removed:
+        return None
+    return {"fields": fields, "pods_upserted": pods_upserted, "pods_removed": pods_removed}
+
+
+class DeploymentFeed:
+    """One upstream view of a deployment, fanned out to every stream subscriber.
+
+    The feed listens to the cluster informers and rebuilds the summary from
+    memory whenever a relevant object changes; metrics-server is polled at
+    most once per DEPLOYMENT_FEED_METRICS_INTERVAL no matter how many
+    dashboards are attached. Subscribers get one snapshot, then diffs.
+    """
+
+    def __init__(self, cluster_data, deployment_name: str, service_name: str):
+        self.cluster_data = cluster_data
+        self.deployment_name = deployment_name
+        self.service_name = service_name
+        self.snapshot = None
+        self.subscribers = set()
+        self._unprimed = set()
+        self._dirty = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._attached = None
+        self._pod_metrics = {}
+        self._metrics_at = 0.0
+        self._task = None
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=DEPLOYMENT_FEED_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        if self.snapshot is not None:
+            queue.put_nowait(("snapshot", self.snapshot))
+        else:
+            self._unprimed.add(queue)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+        self._unprimed.discard(queue)
+
+    async def close(self):
+        self._detach()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def _on_store_event(self, obj):
+        if obj is not None:
+            if obj.metadata.namespace != "default":
+                return
+            labels = obj.metadata.labels or {}
+            if obj.metadata.name not in (self.deployment_name, self.service_name) and labels.get("app") != self.deployment_name:
+                return
+        self._loop.call_soon_threadsafe(self._dirty.set)
+
+    def _attach(self, cluster_informers: ClusterInformers):
+        self._detach()
+        for informer in (cluster_informers.deployments, cluster_informers.pods, cluster_informers.services):
+            informer.store.listeners.append(self._on_store_event)
+        self._attached = cluster_informers
+
+    def _detach(self):
+        if self._attached is not None:
+            for informer in (self._attached.deployments, self._attached.pods, self._attached.services):
+                if self._on_store_event in informer.store.listeners:
+                    informer.store.listeners.remove(self._on_store_event)
+            self._attached = None
+
+    def _put(self, queue: asyncio.Queue, event: str, payload: dict):
+        try:
+            queue.put_nowait((event, payload))
+        except asyncio.QueueFull:
+            # a subscriber that fell behind is resynced with a fresh snapshot
+            while not queue.empty():
+                queue.get_nowait()
+            if self.snapshot is not None:
+                queue.put_nowait(("snapshot", self.snapshot))
+
+    def _publish(self, event: str, payload: dict):
+        for queue in list(self.subscribers):
+            self._put(queue, event, payload)
+
+    async def _run(self):
+        while True:
+            try:
+                # re-resolved every pass: informers that went idle are restarted with new stores
+                cluster_informers = await informers.get(self.cluster_data, "deployments", "pods", "services")
+                if cluster_informers is not self._attached:
+                    self._attach(cluster_informers)
+
+                if time.monotonic() - self._metrics_at >= DEPLOYMENT_FEED_METRICS_INTERVAL:
+                    self._metrics_at = time.monotonic()
+                    try:
+                        self._pod_metrics = await fetch_pod_metrics(self.cluster_data, self.deployment_name)
+                    except Exception as e:
+                        logger.warning(f"Failed to refresh pod metrics for {self.deployment_name}: {str(e)}")
+
+                deployment_obj = cluster_informers.deployments.store.get("default", self.deployment_name)
+                service = cluster_informers.services.store.get("default", self.service_name)
+                if deployment_obj is None or service is None:
+                    self._publish("error", {"detail": f"Deployment {self.deployment_name} or its service not found in cluster"})
+                else:
+                    pods = cluster_informers.pods.store.by_index("app", f"default/{self.deployment_name}")
+                    summary = build_deployment_summary(deployment_obj, pods, service, self._pod_metrics)
+
+                    diff = diff_deployment_summaries(self.snapshot, summary) if self.snapshot is not None else None
+                    self.snapshot = summary
+
+                    for queue in self.subscribers:
+                        if queue in self._unprimed:
+                            self._put(queue, "snapshot", summary)
+                        elif diff is not None:
+                            self._put(queue, "diff", diff)
+                    self._unprimed.clear()
+            except asyncio.CancelledError:
+                raise
+            except HTTPException as e:
+                self._publish("error", {"detail": e.detail})
+            except Exception as e:
+                logger.exception("Deployment feed failed")
+                self._publish("error", {"detail": str(e)})
+
+            self._dirty.clear()
+            try:
+                await asyncio.wait_for(self._dirty.wait(), timeout=DEPLOYMENT_FEED_KEEPALIVE)
+            except asyncio.TimeoutError:
+                pass
+
+
+deployment_feeds = {}
+
+
+@app.get('/deployment-details/{cluster_name}/{deployment_name}/stream')
+async def stream_deployment_summary(cluster_name: str, deployment_name: str):
+    deployment, cluster_data = await run_blocking(fetch_deployment_rows, cluster_name, deployment_name)
+
+    key = (cluster_name, deployment_name)
+    feed = deployment_feeds.get(key)
+    if feed is None:
+        feed = deployment_feeds[key] = DeploymentFeed(cluster_data, deployment_name, deployment["service_name"])
+    queue = feed.subscribe()
+
+    async def events():
+        try:
+            while True:
+                try:
+                    event, payload = await asyncio.wait_for(queue.get(), timeout=DEPLOYMENT_FEED_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        finally:
+            feed.unsubscribe(queue)
+            if not feed.subscribers and deployment_feeds.get(key) is feed:
+                del deployment_feeds[key]
+                await feed.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def build_deployment_summary(deployment_obj, pods: list, service, pod_metrics: dict) -> dict:
+    pod_status_list = []
+    total_restarts = 0
+    running_pods = 0
+
+    for pod in sorted(pods, key=lambda pod: pod.metadata.name):
+        restart_count = sum([cs.restart_count for cs in pod.status.container_statuses or []])
+        total_restarts += restart_count
+        if pod.status.phase == "Running":
+            running_pods += 1
+
+        cpu_usage = pod_metrics.get(pod.metadata.name, {}).get('cpu', 'N/A')
+        memory_usage = pod_metrics.get(pod.metadata.name, {}).get('memory', 'N/A')
+
+        pod_status_list.append({
+            "name": pod.metadata.name,
+            "status": pod.status.phase,
+            "restarts": restart_count,
+            "pod_ip": pod.status.pod_ip,
+            "cpu_usage": cpu_usage,
+            "memory_usage": memory_usage
+        })
+
+    external_ip = None
+    if service.status.load_balancer and service.status.load_balancer.ingress:
+        external_ip = service.status.load_balancer.ingress[0].ip or service.status.load_balancer.ingress[0].hostname
+
+    return {
+        "deployment_name": deployment_obj.metadata.name,
+        "replicas": deployment_obj.spec.replicas,
+        "pods_running": running_pods,
+        "total_restarts": total_restarts,
+        "service_name": service.metadata.name,
+        "external_ip": external_ip,
+        "pod_status_list": pod_status_list
+    }
+
+
 @app.post('/send-kafka-messages')
 async def send_kafka_messages(request: KafkaMessageRequest):
     topic_name = request.topic_name
     message = request.message
     message_count = request.message_count
 
+    bootstrap_servers = await resolve_bootstrap_servers(request.cluster, request.bootstrap_servers, request.port_forward)
+
     try:
-        pod_name_result = subprocess.run(
-            ["kubectl", "get", "pods", "-n", "default", "-l", "app=kafka", "-o", "jsonpath={.items[0].metadata.name}"],
-            capture_output=True, text=True
+        producer = await kafka_producers.get(
+            request.cluster,
+            bootstrap_servers,
+            request.acks,
+            request.linger_ms,
+            request.max_batch_size,
+            request.compression_type
         )
-        pod_name = pod_name_result.stdout.strip()
+    except Exception as e:
+        logger.error(f"Failed to connect Kafka producer to {bootstrap_servers}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to connect to Kafka at {bootstrap_servers}: {str(e)}")
+
+    start = time.perf_counter()
+    try:
+        # send() only enqueues into the producer's batch; delivery is awaited once for the whole run
+        deliveries = []
+        for i in range(1, message_count + 1):
+            deliveries.append(await producer.send(topic_name, value=f"{message} {i}".encode()))
+        results = await asyncio.gather(*deliveries, return_exceptions=True)
+    except Exception as e:
+        logger.error(f"Error while producing Kafka messages: {str(e)}")
+        await kafka_producers.release(producer, broken=True)
+        raise HTTPException(status_code=500, detail=f"Error while producing Kafka messages: {str(e)}")
+    await kafka_producers.release(producer)
+    elapsed = time.perf_counter() - start
+
+    failed = [result for result in results if isinstance(result, Exception)]
+    if failed:
+        logger.error(f"{len(failed)} of {message_count} messages to {topic_name} failed, first error: {failed[0]}")
+        raise HTTPException(status_code=502, detail={
+            "message": f"{len(failed)} of {message_count} messages to topic {topic_name} failed: {failed[0]}",
+            "sent": message_count - len(failed),
+            "failed": len(failed)
+        })
+
+    return {
+        "message": f"Successfully sent {message_count - len(failed)} messages to topic {topic_name}",
+        "sent": message_count - len(failed),
+        "failed": len(failed),
+        "elapsed_seconds": round(elapsed, 3),
+        "messages_per_second": round((message_count - len(failed)) / elapsed, 1) if elapsed > 0 else None
+    }
+
+LOAD_JOB_TICK_SECONDS = 0.05
+LOAD_JOB_LATENCY_SAMPLES = 10000
+LOAD_JOB_HISTORY = int(os.getenv("LOAD_JOB_HISTORY", "100"))
+
+
+class LoadJob:
+    """One rate-controlled producer run, driven by an asyncio task.
+
+    Every tick the job adds rate_at(elapsed) * tick to its send allowance and
+    enqueues that many messages, so the achieved rate follows the profile
+    without a timer per message. Delivery latency is sampled from the
+    producer futures into a bounded reservoir for percentiles.
+    """
+
+    def __init__(self, job_id: str, spec: LoadJobRequest):
+        self.job_id = job_id
+        self.spec = spec
+        self.status = "pending"
+        self.error = None
+        self.sent = 0
+        self.acked = 0
+        self.errors = 0
+        self.started_at = None
+        self.finished_at = None
+        self.latencies = deque(maxlen=LOAD_JOB_LATENCY_SAMPLES)
+        self.task = None
+
+    def rate_at(self, elapsed: float) -> float:
+        spec = self.spec
+        if spec.profile == "ramp":
+            ramp_seconds = spec.ramp_seconds or spec.duration_seconds or 60
+            target = spec.ramp_to_rate if spec.ramp_to_rate is not None else spec.rate
+            rate = spec.rate + (target - spec.rate) * min(elapsed / ramp_seconds, 1.0)
+        elif spec.profile == "step":
+            rate = spec.rate + spec.step_rate * int(elapsed // spec.step_seconds)
+        elif spec.profile == "burst":
+            in_burst = elapsed % spec.burst_interval_seconds < spec.burst_seconds
+            rate = spec.burst_rate if in_burst and spec.burst_rate is not None else spec.rate
+        else:
+            rate = spec.rate
+        # a negative rate would run the send allowance into debt and stall the job
+        return max(0.0, rate)
+
+    def key_for(self, seq: int) -> Optional[bytes]:
+        spec = self.spec
+        if spec.key_distribution == "round_robin":
+            return str(seq % spec.key_count).encode()
+        if spec.key_distribution == "random":
+            return str(random.randrange(spec.key_count)).encode()
+        if spec.key_distribution == "hot":
+            # 80% of traffic on one key, the rest spread over the others
+            return b"0" if random.random() < 0.8 else str(random.randrange(1, max(spec.key_count, 2))).encode()
+        return None
+
+    def payload_for(self, seq: int, key: Optional[bytes]) -> bytes:
+        fields = {"seq": seq, "ts": time.time(), "key": key.decode() if key else "", "padding": ""}
+        payload = self.spec.payload_template.format(**fields)
+        if len(payload) < self.spec.payload_size:
+            fields["padding"] = "x" * (self.spec.payload_size - len(payload))
+            payload = self.spec.payload_template.format(**fields)
+        return payload.encode()
+
+    def _on_delivery(self, sent_at: float, future):
+        if future.cancelled() or future.exception() is not None:
+            self.errors += 1
+        else:
+            self.acked += 1
+            self.latencies.append(time.perf_counter() - sent_at)
 
-        if not pod_name:
-            raise HTTPException(status_code=500, detail="Kafka pod not found.")
+    async def run(self, producer: AIOKafkaProducer):
+        spec = self.spec
+        self.status = "running"
+        self.started_at = time.time()
+        start = time.perf_counter()
+        allowance = 0.0
+        pending = set()
 
-        print(f"Found Kafka pod: {pod_name}") 
+        try:
+            while True:
+                elapsed = time.perf_counter() - start
+                if spec.duration_seconds is not None and elapsed >= spec.duration_seconds:
+                    break
+                if spec.message_count is not None and self.sent >= spec.message_count:
+                    break
+
+                allowance += self.rate_at(elapsed) * LOAD_JOB_TICK_SECONDS
+                batch = int(allowance)
+                if spec.message_count is not None:
+                    batch = min(batch, spec.message_count - self.sent)
+                allowance -= batch
+
+                for _ in range(batch):
+                    self.sent += 1
+                    key = self.key_for(self.sent)
+                    try:
+                        delivery = await producer.send(spec.topic_name, value=self.payload_for(self.sent, key), key=key)
+                    except Exception:
+                        self.errors += 1
+                        continue
+                    delivery.add_done_callback(functools.partial(self._on_delivery, time.perf_counter()))
+                    pending.add(delivery)
+                    delivery.add_done_callback(pending.discard)
+
+                next_tick = start + elapsed + LOAD_JOB_TICK_SECONDS
+                await asyncio.sleep(max(0.0, next_tick - time.perf_counter()))
+
+            if pending:
+                await asyncio.wait(pending)
+            self.status = "completed"
+        except asyncio.CancelledError:
+            self.status = "cancelled"
+        except Exception as e:
+            logger.error(f"Load job {self.job_id} failed: {str(e)}")
+            self.status = "failed"
+            self.error = str(e)
+        finally:
+            self.finished_at = time.time()
+            await kafka_producers.release(producer)
+
+    def stats(self) -> dict:
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        latencies = sorted(self.latencies)
+
+        def percentile(q: float):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 2)
+
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "error": self.error,
+            "topic_name": self.spec.topic_name,
+            "profile": self.spec.profile,
+            "sent": self.sent,
+            "acked": self.acked,
+            "errors": self.errors,
+            "elapsed_seconds": round(elapsed, 3),
+            "target_rate": self.rate_at(elapsed),
+            "achieved_rate": round(self.acked / elapsed, 1) if elapsed > 0 else 0.0,
+            "latency_ms": {"p50": percentile(0.50), "p95": percentile(0.95), "p99": percentile(0.99)}
+        }
 
-        script = f"""
-        for i in $(seq 1 {message_count}); do
-          echo "{message} $i" | /opt/bitnami/kafka/bin/kafka-console-producer.sh --broker-list kafka.default.svc.cluster.local:9092 --topic {topic_name};
-        done
-        """
 
-        print(f"Running script: {script}") 
+load_jobs = OrderedDict()
 
-        exec_result = subprocess.run(
-            ["kubectl", "exec", "-i", pod_name, "-n", "default", "--", "bash", "-c", script],
-            capture_output=True, text=True
-        )
 
-        if exec_result.returncode != 0:
-            raise HTTPException(status_code=500, detail=f"Error while producing Kafka messages: {exec_result.stderr}")
+@app.post('/load-jobs')
+async def start_load_job(request: LoadJobRequest):
+    if request.duration_seconds is None and request.message_count is None:
+        raise HTTPException(status_code=400, detail="Either duration_seconds or message_count is required")
+    if request.profile not in ("constant", "ramp", "step", "burst"):
+        raise HTTPException(status_code=400, detail=f"Unknown profile: {request.profile}")
+    if request.key_distribution not in ("none", "round_robin", "random", "hot"):
+        raise HTTPException(status_code=400, detail=f"Unknown key_distribution: {request.key_distribution}")
+    if request.rate <= 0 or request.key_count <= 0:
+        raise HTTPException(status_code=400, detail="rate and key_count must be positive")
 
-        return {"message": f"Successfully sent {message_count} messages to topic {topic_name}"}
+    job = LoadJob(uuid.uuid4().hex, request)
+    try:
+        job.payload_for(0, None)
+    except (KeyError, IndexError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid payload_template: {str(e)}")
 
-    except subprocess.CalledProcessError as e:
-        print(f"Error executing script: {e}")  
-        raise HTTPException(status_code=500, detail=f"Failed to exec into Kafka pod: {str(e)}")
+    bootstrap_servers = await resolve_bootstrap_servers(request.cluster, request.bootstrap_servers, request.port_forward)
+    try:
+        producer = await kafka_producers.get(
+            request.cluster,
+            bootstrap_servers,
+            request.acks,
+            request.linger_ms,
+            request.max_batch_size,
+            request.compression_type
+        )
     except Exception as e:
-        print(f"Unhandled error: {str(e)}") 
-        raise HTTPException(status_code=500, detail=f"Unhandled error: {str(e)}")
+        logger.error(f"Failed to connect Kafka producer to {bootstrap_servers}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to connect to Kafka at {bootstrap_servers}: {str(e)}")
+
+    job.task = asyncio.create_task(job.run(producer))
+    load_jobs[job.job_id] = job
+
+    # forget the oldest finished jobs once the history is full
+    for job_id in [job_id for job_id, old in load_jobs.items() if old.task.done()][:max(0, len(load_jobs) - LOAD_JOB_HISTORY)]:
+        del load_jobs[job_id]
+
+    return {"job_id": job.job_id, "status": job.status}
+
+
+@app.get('/load-jobs')
+async def list_load_jobs():
+    return {"jobs": [job.stats() for job in load_jobs.values()]}
+
+
+@app.get('/load-jobs/{job_id}')
+async def get_load_job(job_id: str):
+    job = load_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Load job not found")
+    return job.stats()
+
+
+@app.delete('/load-jobs/{job_id}')
+async def cancel_load_job(job_id: str):
+    job = load_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Load job not found")
+    if not job.task.done():
+        job.task.cancel()
+        await asyncio.gather(job.task, return_exceptions=True)
+    return job.stats()
+
 
 if __name__ == "__main__":
     import uvicorn
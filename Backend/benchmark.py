@@ -0,0 +1,646 @@
+"""Offline load benchmark for the backend.
+
+    python benchmark.py                                   # run, print a table, write Backend/benchmark_results.json
+    python benchmark.py --save-baseline benchmark_baseline.json
+    python benchmark.py --baseline benchmark_baseline.json   # exit 1 if anything regressed
+
+No AWS account, cluster or broker is needed. Three child processes are started:
+
+- `benchmark.py fake-api`: a Kubernetes API server stand-in (discovery, list/watch,
+  server-side apply, delete, metrics.k8s.io) with a configurable pod count and
+  per-request latency;
+- `benchmark.py serve`: the FastAPI app itself under uvicorn, with EKS
+  describe_cluster answering from a stub that points at the fake API server, a
+  stand-in Kafka admin client, and fake kubectl/helm scripts first on PATH;
+- the load generator, this process, which drives every scenario at increasing
+  concurrency and reports p50/p95/p99 latency, requests per second and the
+  server's RSS.
+"""
+import argparse
+import base64
+import http.client
+import json
+import os
+import re
+import socket
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+CLUSTER_NAME = "bench"
+TOPIC_NAME = "bench-topic"
+CONSUMER_GROUP_NAME = "bench-group"
+WATCH_HOLD_SECONDS = 10
+
+SCENARIOS = [
+    {"name": "clusters", "method": "GET", "path": "/clusters"},
+    {"name": "kafka-topics", "method": "GET", "path": "/kafka-topics"},
+    {"name": "deployments", "method": "GET", "path": f"/deployments/{CLUSTER_NAME}"},
+    {"name": "namespaces", "method": "GET", "path": f"/namespaces?cluster={CLUSTER_NAME}"},
+    {"name": "pods", "method": "GET", "path": f"/pods?cluster={CLUSTER_NAME}&namespace=default"},
+    {"name": "pods-page", "method": "GET", "path": f"/pods?cluster={CLUSTER_NAME}&namespace=default&limit=100"},
+    {"name": "deployment-details", "method": "GET", "path": f"/deployment-details/{CLUSTER_NAME}/app-0"},
+    {"name": "fanout-pods", "method": "GET", "path": "/clusters/pods"},
+    # job scenarios are timed from submission until the job finishes, not just the 202
+    {"name": "deploy-unchanged", "method": "POST", "path": f"/deploy/{CLUSTER_NAME}", "app": 0, "job": True, "max_concurrency": 4},
+    {"name": "install-keda", "method": "POST", "path": f"/install-keda/{CLUSTER_NAME}", "job": True, "max_concurrency": 4},
+]
+
+
+# --- fake Kubernetes API server -------------------------------------------------------------
+
+API_RESOURCES = {
+    "v1": [("pods", "Pod", True), ("services", "Service", True), ("namespaces", "Namespace", False)],
+    "apps/v1": [("deployments", "Deployment", True), ("statefulsets", "StatefulSet", True)],
+    "keda.sh/v1alpha1": [("scaledobjects", "ScaledObject", True)],
+    "metrics.k8s.io/v1beta1": [("pods", "PodMetrics", True)],
+}
+PATH_PATTERN = re.compile(
+    r"^/(?:api/(?P<core>v1)|apis/(?P<group>[^/]+)/(?P<version>[^/]+))"
+    r"(?:/namespaces/(?P<namespace>[^/]+))?(?:/(?P<plural>[^/]+)(?:/(?P<name>[^/]+))?)?$"
+)
+
+
+class FakeKubeApi:
+    """In-memory objects behind the handful of API paths the backend uses."""
+
+    def __init__(self, pod_count: int, apps: int):
+        self._lock = threading.Lock()
+        self._resource_version = 1
+        self.objects = {}
+        self.namespaces = [{"metadata": {"name": name, "resourceVersion": "1"}} for name in ("default", "kube-system", "keda")]
+        self.pods = [self._pod(index, f"app-{index % apps}") for index in range(pod_count)]
+
+    @staticmethod
+    def _pod(index: int, app_name: str) -> dict:
+        return {
+            "metadata": {
+                "name": f"{app_name}-{index}",
+                "namespace": "default",
+                "labels": {"app": app_name},
+                "resourceVersion": "1",
+                "uid": str(uuid.UUID(int=index)),
+            },
+            "spec": {
+                "nodeName": f"node-{index % 8}",
+                "containers": [{
+                    "name": "app",
+                    "image": "bench/app:latest",
+                    "resources": {"requests": {"cpu": "100m", "memory": "128Mi"}},
+                }],
+            },
+            "status": {
+                "phase": "Running",
+                "podIP": f"10.0.{index // 250}.{index % 250 + 1}",
+                "containerStatuses": [{
+                    "name": "app",
+                    "image": "bench/app:latest",
+                    "imageID": "",
+                    "ready": True,
+                    "restartCount": 0,
+                    "state": {"running": {"startedAt": "2024-01-01T00:00:00Z"}},
+                }],
+            },
+        }
+
+    def _next_version(self) -> str:
+        self._resource_version += 1
+        return str(self._resource_version)
+
+    def _stored(self, api_version: str, plural: str, namespace: str = None) -> list:
+        return [
+            obj for (version, kind_plural, obj_namespace, _), obj in self.objects.items()
+            if version == api_version and kind_plural == plural and (namespace is None or obj_namespace == namespace)
+        ]
+
+    def handle(self, method: str, path: str, query: dict, body: bytes) -> tuple:
+        match = PATH_PATTERN.match(path)
+        if not match:
+            return 404, {"kind": "Status", "code": 404, "message": f"{path} not found"}
+        api_version = match["core"] or f"{match['group']}/{match['version']}"
+        namespace, plural, name = match["namespace"], match["plural"], match["name"]
+
+        if plural is None:
+            resources = API_RESOURCES.get(api_version)
+            if resources is None:
+                return 404, {"kind": "Status", "code": 404}
+            return 200, {
+                "kind": "APIResourceList",
+                "groupVersion": api_version,
+                "resources": [{"name": res, "kind": kind, "namespaced": namespaced, "verbs": []} for res, kind, namespaced in resources],
+            }
+        # /api/v1/namespaces/<name> reads a namespace, it doesn't scope anything
+        if plural == "namespaces" and name is None and namespace is not None:
+            plural, name, namespace = "namespaces", namespace, None
+
+        with self._lock:
+            if name is None:
+                return 200, self._list(api_version, namespace, plural, query)
+            key = (api_version, plural, namespace, name)
+            if method == "PATCH":
+                try:
+                    manifest = json.loads(body)
+                except ValueError:
+                    manifest = None
+                if not isinstance(manifest, dict):
+                    # what the API server answers when the apply body isn't an object
+                    return 400, {"kind": "Status", "code": 400, "reason": "BadRequest", "message": "error decoding patch: not an object"}
+                return 200, self._apply(key, manifest)
+            if method == "DELETE":
+                if self.objects.pop(key, None) is None:
+                    return 404, {"kind": "Status", "code": 404, "reason": "NotFound"}
+                return 200, {"kind": "Status", "status": "Success"}
+            if plural == "pods" and api_version == "v1":
+                for pod in self.pods:
+                    if pod["metadata"]["name"] == name and pod["metadata"]["namespace"] == namespace:
+                        return 200, pod
+            obj = self.objects.get(key)
+            if obj is None:
+                return 404, {"kind": "Status", "code": 404, "reason": "NotFound"}
+            return 200, obj
+
+    def _apply(self, key: tuple, manifest: dict) -> dict:
+        manifest.setdefault("metadata", {}).update(resourceVersion=self._next_version(), uid=str(uuid.uuid4()))
+        if manifest.get("kind") == "Deployment":
+            replicas = manifest.get("spec", {}).get("replicas", 1)
+            manifest["status"] = {"replicas": replicas, "readyReplicas": replicas, "availableReplicas": replicas}
+        elif manifest.get("kind") == "Service":
+            manifest["status"] = {"loadBalancer": {}}
+        self.objects[key] = manifest
+        return manifest
+
+    def _list(self, api_version: str, namespace: str, plural: str, query: dict) -> dict:
+        if api_version == "v1" and plural == "pods":
+            items = [pod for pod in self.pods if namespace is None or pod["metadata"]["namespace"] == namespace]
+        elif api_version == "metrics.k8s.io/v1beta1":
+            items = [
+                {
+                    "metadata": {"name": pod["metadata"]["name"], "namespace": pod["metadata"]["namespace"], "labels": pod["metadata"]["labels"]},
+                    "containers": [{"name": "app", "usage": {"cpu": "12m", "memory": "64Mi"}}],
+                }
+                for pod in self.pods if namespace is None or pod["metadata"]["namespace"] == namespace
+            ]
+        elif api_version == "v1" and plural == "namespaces":
+            items = self.namespaces
+        else:
+            items = self._stored(api_version, plural, namespace)
+
+        selector = (query.get("labelSelector") or [None])[0]
+        if selector and "=" in selector:
+            label, value = selector.split("=", 1)
+            items = [item for item in items if (item["metadata"].get("labels") or {}).get(label) == value]
+
+        start = int((query.get("continue") or ["0"])[0] or 0)
+        limit = int((query.get("limit") or ["0"])[0] or 0)
+        page = items[start:start + limit] if limit else items[start:]
+        next_start = start + len(page)
+        return {
+            "kind": "List",
+            "apiVersion": api_version,
+            "metadata": {
+                "resourceVersion": str(self._resource_version),
+                "continue": str(next_start) if limit and next_start < len(items) else None,
+            },
+            "items": page,
+        }
+
+
+def run_fake_api(args):
+    api = FakeKubeApi(args.pods, args.apps)
+    latency = args.latency_ms / 1000
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _respond(self):
+            url = urlsplit(self.path)
+            query = parse_qs(url.query)
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if latency:
+                time.sleep(latency)
+
+            if (query.get("watch") or ["false"])[0] == "true":
+                # no events; the informer simply watches again once the stream ends
+                time.sleep(min(float((query.get("timeoutSeconds") or [WATCH_HOLD_SECONDS])[0]), WATCH_HOLD_SECONDS))
+                status, payload = 200, b""
+            else:
+                status, obj = api.handle(self.command, url.path, query, body)
+                payload = json.dumps(obj).encode()
+
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        do_GET = do_PATCH = do_DELETE = do_POST = do_PUT = _respond
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), Handler)
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+# --- the app, with AWS, Kafka and CLI stand-ins --------------------------------------------
+
+FAKE_HELM = """#!/bin/sh
+sleep {latency}
+case "$*" in
+  *" list "*) echo "NAME	NAMESPACE	REVISION	UPDATED	STATUS	CHART	APP VERSION" ;;
+  *) echo "STATUS: deployed" ;;
+esac
+"""
+FAKE_KUBECTL = """#!/bin/sh
+sleep {latency}
+echo "{{}}"
+"""
+
+
+class FakeEksClient:
+    def __init__(self, api_url: str, latency: float):
+        self.api_url = api_url
+        self.latency = latency
+
+    def describe_cluster(self, name: str) -> dict:
+        time.sleep(self.latency)
+        return {"cluster": {
+            "name": name,
+            "endpoint": self.api_url,
+            "certificateAuthority": {"data": base64.b64encode(b"benchmark").decode()},
+        }}
+
+
+class FakeTopicResponse:
+    def __init__(self, topic_errors: list):
+        self.topic_errors = topic_errors
+
+
+class FakeKafkaAdmin:
+    """Answers the admin calls the backend makes, from memory."""
+
+    def __init__(self, partitions: int):
+        self.partitions = partitions
+        self.topics = {}
+
+    async def create_topics(self, new_topics):
+        errors = []
+        for topic in new_topics:
+            # 36 is TopicAlreadyExistsError
+            errors.append((topic.name, 36 if topic.name in self.topics else 0))
+            self.topics.setdefault(topic.name, topic.num_partitions)
+        return FakeTopicResponse(errors)
+
+    async def describe_topics(self, topic_names=None):
+        names = topic_names or list(self.topics)
+        return [
+            {
+                "topic": name,
+                "error_code": 0 if name in self.topics else 3,
+                "is_internal": False,
+                "partitions": [
+                    {"partition": partition, "leader": 0, "replicas": [0]}
+                    for partition in range(self.topics.get(name, 0))
+                ],
+            }
+            for name in names
+        ]
+
+    async def list_topics(self):
+        return list(self.topics)
+
+    async def list_consumer_groups(self):
+        return [(CONSUMER_GROUP_NAME, "consumer")]
+
+
+def run_serve(args):
+    import uvicorn
+    import app as backend
+
+    eks = FakeEksClient(args.api_url, args.eks_latency_ms / 1000)
+    real_client = backend.aws_clients.client
+
+    def client(service, region, access_key, secret_key, endpoint_url=None):
+        # STS only presigns locally, so the real client works offline; EKS needs the stub
+        if service == "eks":
+            return eks
+        return real_client(service, region, access_key, secret_key, endpoint_url=endpoint_url)
+
+    backend.aws_clients.client = client
+    admin = FakeKafkaAdmin(args.partitions)
+
+    async def get_admin(cluster_name, bootstrap_servers):
+        return admin
+
+    backend.kafka_admins.get = get_admin
+    uvicorn.run(backend.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+# --- load generation --------------------------------------------------------------------------
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Nothing listening on port {port} after {timeout}s")
+
+
+def request(port: int, method: str, path: str, body: dict = None, timeout: float = 60) -> tuple:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        payload = json.dumps(body).encode() if body is not None else None
+        conn.request(method, path, body=payload, headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+
+def wait_for_job(port: int, job_id: str, timeout: float = 120) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status, body = request(port, "GET", f"/jobs/{job_id}")
+        job = json.loads(body)
+        if status >= 400 or job["status"] in ("succeeded", "failed", "interrupted"):
+            return job
+        time.sleep(0.1)
+    raise RuntimeError(f"Job {job_id} did not finish within {timeout}s")
+
+
+def rss_mb(pid: int) -> dict:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return {"rss_mb": None, "peak_rss_mb": None}
+    return {
+        "rss_mb": round(int(fields["VmRSS"].split()[0]) / 1024, 1),
+        "peak_rss_mb": round(int(fields["VmHWM"].split()[0]) / 1024, 1),
+    }
+
+
+def percentile(sorted_values: list, fraction: float):
+    if not sorted_values:
+        return None
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return round(sorted_values[index] * 1000, 2)
+
+
+def deployment_body(index: int) -> dict:
+    return {
+        "deployment_name": f"app-{index}",
+        "docker_image": "bench/app",
+        "docker_tag": "latest",
+        "cpu_requests": "100m",
+        "memory_requests": "128",
+        "cpu_limits": "500m",
+        "memory_limits": "256",
+        "ports": [80],
+        "target_ports": [8080],
+        "kafka_topic": TOPIC_NAME,
+        "consumer_group_name": CONSUMER_GROUP_NAME,
+    }
+
+
+def run_level(port: int, server_pid: int, scenario: dict, concurrency: int, duration: float) -> dict:
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    body = deployment_body(scenario["app"]) if "app" in scenario else None
+    payload = json.dumps(body).encode() if body is not None else None
+    started = time.perf_counter()
+    stop_at = started + duration
+
+    def worker():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        local, failed = [], 0
+        while time.perf_counter() < stop_at:
+            sent = time.perf_counter()
+            try:
+                conn.request(scenario["method"], scenario["path"], body=payload, headers={"Content-Type": "application/json"})
+                response = conn.getresponse()
+                content = response.read()
+                if response.status >= 400:
+                    failed += 1
+                elif scenario.get("job"):
+                    job = wait_for_job(port, json.loads(content)["job_id"])
+                    if job["status"] != "succeeded":
+                        failed += 1
+            except (OSError, http.client.HTTPException, RuntimeError):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+                continue
+            local.append(time.perf_counter() - sent)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "scenario": scenario["name"],
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        **rss_mb(server_pid),
+    }
+
+
+def compare(results: list, baseline: list, tolerance: float) -> list:
+    """Rows whose p95 grew or whose throughput dropped by more than tolerance."""
+    previous = {(row["scenario"], row["concurrency"]): row for row in baseline}
+    regressions = []
+    for row in results:
+        before = previous.get((row["scenario"], row["concurrency"]))
+        if before is None:
+            continue
+        reasons = []
+        if before["p95_ms"] and row["p95_ms"] and row["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            reasons.append(f"p95 {before['p95_ms']} -> {row['p95_ms']} ms")
+        if before["rps"] and row["rps"] < before["rps"] * (1 - tolerance):
+            reasons.append(f"rps {before['rps']} -> {row['rps']}")
+        if row["errors"] > before["errors"]:
+            reasons.append(f"errors {before['errors']} -> {row['errors']}")
+        if reasons:
+            regressions.append({"scenario": row["scenario"], "concurrency": row["concurrency"], "reasons": reasons})
+    return regressions
+
+
+def print_table(results: list):
+    header = f"{'scenario':<20}{'conc':>6}{'reqs':>8}{'err':>6}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rss MB':>9}"
+    print(header)
+    print("-" * len(header))
+    for row in results:
+        print(
+            f"{row['scenario']:<20}{row['concurrency']:>6}{row['requests']:>8}{row['errors']:>6}{row['rps']:>10}"
+            f"{str(row['p50_ms']):>10}{str(row['p95_ms']):>10}{str(row['p99_ms']):>10}{str(row['rss_mb']):>9}"
+        )
+
+
+def run_benchmark(args) -> int:
+    workdir = tempfile.mkdtemp(prefix="kedaapp-bench-")
+    bin_dir = os.path.join(workdir, "bin")
+    os.makedirs(bin_dir)
+    for name, script in (("helm", FAKE_HELM), ("kubectl", FAKE_KUBECTL)):
+        path = os.path.join(bin_dir, name)
+        with open(path, "w") as f:
+            f.write(script.format(latency=args.cli_latency_ms / 1000))
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+
+    api_port, app_port = free_port(), free_port()
+    script = os.path.abspath(__file__)
+    env = {
+        **os.environ,
+        "PATH": bin_dir + os.pathsep + os.environ.get("PATH", ""),
+        "PYTHONPATH": os.path.dirname(script) + os.pathsep + os.environ.get("PYTHONPATH", ""),
+        "DB_PATH": os.path.join(workdir, "clusters.db"),
+        "LAG_MONITOR_ENABLED": "false",
+    }
+    log = open(os.path.join(workdir, "server.log"), "w")
+    processes = [
+        subprocess.Popen(
+            [sys.executable, script, "fake-api", "--port", str(api_port), "--pods", str(args.pods),
+             "--apps", str(args.apps), "--latency-ms", str(args.api_latency_ms)],
+            stdout=log, stderr=subprocess.STDOUT
+        ),
+        subprocess.Popen(
+            [sys.executable, script, "serve", "--port", str(app_port), "--api-url", f"http://127.0.0.1:{api_port}",
+             "--eks-latency-ms", str(args.eks_latency_ms), "--partitions", str(args.partitions)],
+            cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT
+        ),
+    ]
+    server_pid = processes[1].pid
+
+    try:
+        wait_for_port(api_port)
+        wait_for_port(app_port)
+
+        setup = [
+            ("POST", "/register-cluster", {"access_key": "AKIABENCHMARK", "secret_key": "benchmark", "cluster_name": CLUSTER_NAME, "region": "us-east-1"}),
+            ("POST", f"/create-kafka-topic/{CLUSTER_NAME}", {"topic_name": TOPIC_NAME, "consumer_group_name": CONSUMER_GROUP_NAME, "partitions": args.partitions}),
+        ] + [("POST", f"/deploy/{CLUSTER_NAME}", deployment_body(index)) for index in range(args.apps)] + [
+            # start the informers so the first measured request doesn't pay for the initial list
+            ("GET", f"/pods?cluster={CLUSTER_NAME}&namespace=default", None),
+            ("GET", f"/deployment-details/{CLUSTER_NAME}/app-0", None),
+        ]
+        for method, path, body in setup:
+            status, response = request(app_port, method, path, body)
+            if status == 202:
+                job = wait_for_job(app_port, json.loads(response)["job_id"])
+                if job["status"] != "succeeded":
+                    raise RuntimeError(f"Setup job for {method} {path} ended {job['status']}: {job['error']!r}")
+            elif status >= 400:
+                raise RuntimeError(f"Setup call {method} {path} failed with {status}: {response[:500]!r}")
+
+        wanted = set(args.scenarios.split(",")) if args.scenarios else None
+        levels = [int(level) for level in args.concurrency.split(",")]
+        results = []
+        for scenario in SCENARIOS:
+            if wanted and scenario["name"] not in wanted:
+                continue
+            for concurrency in levels:
+                if concurrency > scenario.get("max_concurrency", concurrency):
+                    continue
+                results.append(run_level(app_port, server_pid, scenario, concurrency, args.duration))
+                print(f"  {scenario['name']} x{concurrency}: {results[-1]['rps']} rps", file=sys.stderr)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+        log.close()
+
+    print_table(results)
+    with open(args.output, "w") as f:
+        json.dump({"parameters": vars(args), "results": results}, f, indent=2, default=str)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"parameters": vars(args), "results": results}, f, indent=2, default=str)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline} (tolerance {args.tolerance:.0%}):")
+            for regression in regressions:
+                print(f"  {regression['scenario']} x{regression['concurrency']}: {'; '.join(regression['reasons'])}")
+            return 1
+        print(f"\nNo regressions against {args.baseline}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    subparsers = parser.add_subparsers(dest="command")
+
+    fake_api = subparsers.add_parser("fake-api")
+    fake_api.add_argument("--port", type=int, required=True)
+    fake_api.add_argument("--pods", type=int, default=500)
+    fake_api.add_argument("--apps", type=int, default=10)
+    fake_api.add_argument("--latency-ms", type=float, default=5)
+
+    serve = subparsers.add_parser("serve")
+    serve.add_argument("--port", type=int, required=True)
+    serve.add_argument("--api-url", required=True)
+    serve.add_argument("--eks-latency-ms", type=float, default=100)
+    serve.add_argument("--partitions", type=int, default=8)
+
+    parser.add_argument("--concurrency", default="1,4,16,64", help="comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=5, help="seconds per scenario and level")
+    parser.add_argument("--scenarios", help="comma-separated subset of: " + ", ".join(s["name"] for s in SCENARIOS))
+    parser.add_argument("--pods", type=int, default=500)
+    parser.add_argument("--apps", type=int, default=10)
+    parser.add_argument("--partitions", type=int, default=8)
+    parser.add_argument("--api-latency-ms", type=float, default=5)
+    parser.add_argument("--eks-latency-ms", type=float, default=100)
+    parser.add_argument("--cli-latency-ms", type=float, default=50)
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_results.json"),
+                        help="where to write the results (default: next to this script)")
+    parser.add_argument("--baseline", help="fail on regressions against this results file")
+    parser.add_argument("--save-baseline", help="also write the results here, to compare later runs against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative change before flagging")
+    args = parser.parse_args()
+
+    if args.command == "fake-api":
+        run_fake_api(args)
+        return 0
+    if args.command == "serve":
+        run_serve(args)
+        return 0
+    return run_benchmark(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Single-node stand-in Kafka broker for exercising the producer paths without a cluster.
+
+    python kafka_standin.py --port 9092 --partitions 8
+
+then point /send-kafka-messages or /load-jobs at it with
+"bootstrap_servers": "127.0.0.1:9092". The broker speaks just enough of the
+0.10 protocol for a producer: ApiVersions, Metadata (topics are created on
+first use) and Produce. Records are counted, not stored; every
+--report-interval seconds the messages and rate per topic are printed.
+"""
+import argparse
+import asyncio
+import io
+import struct
+import time
+from collections import Counter
+
+from aiokafka.protocol.admin import ApiVersionResponse_v0
+from aiokafka.protocol.metadata import MetadataRequest, MetadataResponse
+from aiokafka.protocol.produce import ProduceRequest, ProduceResponse
+from aiokafka.record.memory_records import MemoryRecords
+
+API_VERSIONS_KEY = 18
+METADATA_KEY = 3
+PRODUCE_KEY = 0
+# advertised max versions: what a 0.10.0 broker supports, so clients stay on message format v1
+SUPPORTED_VERSIONS = {PRODUCE_KEY: 2, METADATA_KEY: 1, API_VERSIONS_KEY: 0}
+NODE_ID = 0
+
+
+class StandinBroker:
+    def __init__(self, host: str, port: int, partitions: int):
+        self.host = host
+        self.port = port
+        self.partitions = partitions
+        self.topics = {}
+        self.received = Counter()
+        self.offsets = Counter()
+
+    def _metadata(self, version: int, topics: list):
+        for topic in topics:
+            self.topics.setdefault(topic, self.partitions)
+        topic_entries = []
+        for topic in topics if topics else list(self.topics):
+            partitions = [(0, partition, NODE_ID, [NODE_ID], [NODE_ID]) for partition in range(self.topics[topic])]
+            topic_entries.append((0, topic, False, partitions) if version == 1 else (0, topic, partitions))
+        if version == 1:
+            return MetadataResponse[1]([(NODE_ID, self.host, self.port, None)], NODE_ID, topic_entries)
+        return MetadataResponse[0]([(NODE_ID, self.host, self.port)], topic_entries)
+
+    def _produce(self, version: int, request):
+        topics = []
+        for topic, partitions in request.topics:
+            results = []
+            for partition, records in partitions:
+                count = 0
+                batches = MemoryRecords(records)
+                while batches.has_next():
+                    count += sum(1 for _ in batches.next_batch())
+                self.received[topic] += count
+                results.append((partition, 0, self.offsets[(topic, partition)], -1))
+                self.offsets[(topic, partition)] += count
+            topics.append((topic, results))
+        return ProduceResponse[version](topics, 0), request.required_acks != 0
+
+    def respond(self, api_key: int, api_version: int, body: io.BytesIO):
+        """The response struct for one request, and whether the client expects it."""
+        if api_key == API_VERSIONS_KEY:
+            return ApiVersionResponse_v0(0, [(key, 0, version) for key, version in SUPPORTED_VERSIONS.items()]), True
+        if api_version > SUPPORTED_VERSIONS.get(api_key, -1):
+            # what a real broker does with a request it doesn't know: drop the connection
+            raise ConnectionError(f"Unsupported request: api_key={api_key} version={api_version}")
+        if api_key == METADATA_KEY:
+            return self._metadata(api_version, MetadataRequest[api_version].decode(body).topics or []), True
+        return self._produce(api_version, ProduceRequest[api_version].decode(body))
+
+    async def serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                size, = struct.unpack(">i", await reader.readexactly(4))
+                body = io.BytesIO(await reader.readexactly(size))
+                api_key, api_version, correlation_id, client_id_length = struct.unpack(">hhih", body.read(10))
+                body.read(max(client_id_length, 0))
+
+                response, expected = self.respond(api_key, api_version, body)
+                if expected:
+                    payload = struct.pack(">i", correlation_id) + response.encode()
+                    writer.write(struct.pack(">i", len(payload)) + payload)
+                    await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def report(self, interval: float):
+        previous, previous_at = Counter(), time.monotonic()
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for topic, total in sorted(self.received.items()):
+                rate = (total - previous[topic]) / (now - previous_at)
+                if rate:
+                    print(f"{topic}: {total} messages, {rate:.0f} msg/s", flush=True)
+            previous, previous_at = Counter(self.received), now
+
+
+async def main(args):
+    broker = StandinBroker(args.advertised_host, args.port, args.partitions)
+    server = await asyncio.start_server(broker.serve_client, args.host, args.port)
+    print(f"Stand-in broker listening on {args.host}:{args.port}", flush=True)
+    asyncio.get_running_loop().create_task(broker.report(args.report_interval))
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--advertised-host", default="127.0.0.1", help="host clients are told to connect to")
+    parser.add_argument("--port", type=int, default=9092)
+    parser.add_argument("--partitions", type=int, default=1, help="partitions of auto-created topics")
+    parser.add_argument("--report-interval", type=float, default=5)
+    asyncio.run(main(parser.parse_args()))
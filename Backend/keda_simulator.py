@@ -0,0 +1,279 @@
+"""Offline model of KEDA's Kafka scaler driving an HPA, for tuning ScaledObject settings.
+
+An arrival profile (messages per second on a fixed time grid) is replayed
+against every parameter combination at once: each combination is one lane of
+a numpy array, so a sweep over thousands of combinations costs one pass over
+the time grid. Nothing here talks to a cluster or a broker.
+
+The model follows what KEDA and the HPA actually do:
+
+- every HPA sync period the desired replica count is ceil(lag / lagThreshold),
+  clamped to [minReplicaCount, maxReplicaCount] and to the partition count
+  (the Kafka scaler never asks for idle consumers);
+- scale-up uses the lowest recommendation within its stabilization window
+  and scale-down the highest within its own; each direction is rate-limited
+  by its policies against the replica count at the start of the policy
+  period, counting the changes made within it (scaleUp: pods and percent, the
+  larger wins; scaleDown: percent);
+- with minReplicaCount 0, KEDA activates on a polling tick once lag exceeds
+  the activation threshold, and scales back to zero cooldownPeriod after lag
+  was last above it;
+- new pods only consume after pod_startup_seconds.
+
+HPA_SYNC_SECONDS is kube-controller-manager's default
+--horizontal-pod-autoscaler-sync-period; it isn't a ScaledObject setting.
+"""
+import numpy as np
+
+HPA_SYNC_SECONDS = 15
+
+DEFAULTS = {
+    "lag_threshold": 10,
+    "min_replica_count": 1,
+    "max_replica_count": 10,
+    "polling_interval": 30,
+    "cooldown_period": 300,
+    "activation_lag_threshold": 0,
+    "scale_up_stabilization_seconds": 0,
+    "scale_up_pods": 4,
+    "scale_up_percent": 100,
+    "scale_up_period_seconds": 15,
+    "scale_down_stabilization_seconds": 300,
+    "scale_down_percent": 100,
+    "scale_down_period_seconds": 15,
+}
+
+# the subset that ends up in a ScaledObject, see recommend()
+SCALED_OBJECT_PARAMETERS = (
+    "lag_threshold",
+    "min_replica_count",
+    "max_replica_count",
+    "polling_interval",
+    "cooldown_period",
+    "activation_lag_threshold",
+    "scale_up_stabilization_seconds",
+    "scale_up_pods",
+    "scale_up_percent",
+    "scale_up_period_seconds",
+    "scale_down_stabilization_seconds",
+    "scale_down_percent",
+    "scale_down_period_seconds",
+)
+
+
+def synthetic_profile(profile: str, rate: float, duration_seconds: float, step_seconds: float = 1.0,
+                      ramp_to_rate: float = None, ramp_seconds: float = None,
+                      step_rate: float = 0, step_interval_seconds: float = 10,
+                      burst_rate: float = None, burst_seconds: float = 1, burst_interval_seconds: float = 10) -> np.ndarray:
+    """Arrival rate per step for the same profiles the load jobs generate."""
+    elapsed = np.arange(0, duration_seconds, step_seconds, dtype=float)
+    if profile == "ramp":
+        target = ramp_to_rate if ramp_to_rate is not None else rate
+        return rate + (target - rate) * np.minimum(elapsed / (ramp_seconds or duration_seconds), 1.0)
+    if profile == "step":
+        return rate + step_rate * np.floor(elapsed / step_interval_seconds)
+    if profile == "burst":
+        in_burst = np.mod(elapsed, burst_interval_seconds) < burst_seconds
+        return np.where(in_burst, burst_rate if burst_rate is not None else rate, rate)
+    if profile == "constant":
+        return np.full(elapsed.shape, float(rate))
+    raise ValueError(f"Unknown profile: {profile}")
+
+
+def profile_from_samples(timestamps: list, rates: list, step_seconds: float = 1.0) -> np.ndarray:
+    """Resample recorded (timestamp, messages/second) points, e.g. lag-monitor history, onto the step grid."""
+    timestamps = np.asarray(timestamps, dtype=float)
+    rates = np.nan_to_num(np.asarray(rates, dtype=float))
+    if timestamps.size < 2:
+        raise ValueError("At least two samples are needed to build a profile")
+    order = np.argsort(timestamps)
+    timestamps, rates = timestamps[order] - timestamps[order][0], rates[order]
+    return np.interp(np.arange(0, timestamps[-1], step_seconds), timestamps, rates)
+
+
+def parameter_grid(**values) -> dict:
+    """Cartesian product of the given parameter lists, one flat array per parameter.
+
+    Parameters that are not given keep their DEFAULTS value.
+    """
+    unknown = set(values) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+    names = list(DEFAULTS)
+    axes = [np.atleast_1d(np.asarray(values.get(name, DEFAULTS[name]), dtype=float)) for name in names]
+    mesh = np.meshgrid(*axes, indexing="ij")
+    grid = {name: axis.ravel() for name, axis in zip(names, mesh)}
+    # combinations that can never be valid are dropped rather than simulated
+    valid = (grid["max_replica_count"] >= np.maximum(grid["min_replica_count"], 1)) & (grid["lag_threshold"] > 0)
+    return {name: axis[valid] for name, axis in grid.items()}
+
+
+# per-lane vectors simulate() keeps besides the history arrays, rounded up
+_STATE_VECTORS = 32
+
+
+def _startup_steps(pod_startup_seconds: float, step_seconds: float) -> int:
+    return max(int(round(pod_startup_seconds / step_seconds)), 0)
+
+
+def _window_rows(max_window_seconds: float) -> int:
+    return int(np.ceil(max_window_seconds / HPA_SYNC_SECONDS)) + 1
+
+
+def _longest(params: dict, *names) -> float:
+    return max(float(np.max(params.get(name, DEFAULTS[name]), initial=0)) for name in names)
+
+
+def state_floats(params: dict, pod_startup_seconds: float = 30, step_seconds: float = 1.0) -> int:
+    """How many float64 values simulate() holds at once for these parameters, to bound memory before running."""
+    size = len(next(iter(params.values())))
+    recommendation_rows = _window_rows(_longest(params, "scale_up_stabilization_seconds", "scale_down_stabilization_seconds"))
+    # scale events keep two rows each: pods added and pods removed
+    event_rows = 2 * _window_rows(_longest(params, "scale_up_period_seconds", "scale_down_period_seconds"))
+    rows = recommendation_rows + event_rows + _startup_steps(pod_startup_seconds, step_seconds) + 1 + _STATE_VECTORS
+    return rows * size
+
+
+def simulate(arrival_rates: np.ndarray, params: dict, per_pod_throughput: float, partitions: int = None,
+             pod_startup_seconds: float = 30, step_seconds: float = 1.0, initial_backlog: float = 0) -> dict:
+    """Replay arrival_rates against every combination in params.
+
+    Returns per-combination arrays: backlog_peak (messages), time_to_drain
+    (seconds from the peak until lag is back under lagThreshold, NaN if it
+    never is), replica_minutes (scheduled pods, startup included),
+    scale_up_latency (seconds from lag first exceeding what the ready pods
+    are sized for until an extra pod is ready, NaN if that never happened),
+    max_replicas and final_backlog.
+    """
+    arrival_rates = np.asarray(arrival_rates, dtype=float)
+    size = len(next(iter(params.values())))
+    p = {name: np.broadcast_to(np.asarray(params.get(name, DEFAULTS[name]), dtype=float), (size,)) for name in DEFAULTS}
+
+    cap = p["max_replica_count"] if partitions is None else np.minimum(p["max_replica_count"], partitions)
+    floor = np.maximum(p["min_replica_count"], 1)
+    poll_every = np.maximum(np.round(p["polling_interval"] / step_seconds), 1).astype(np.int64)
+    sync_every = max(int(round(HPA_SYNC_SECONDS / step_seconds)), 1)
+    startup_steps = _startup_steps(pod_startup_seconds, step_seconds)
+    window_rows = _window_rows(_longest(p, "scale_up_stabilization_seconds", "scale_down_stabilization_seconds"))
+    event_rows = _window_rows(_longest(p, "scale_up_period_seconds", "scale_down_period_seconds"))
+
+    backlog = np.full(size, float(initial_backlog))
+    target = np.where(p["min_replica_count"] > 0, p["min_replica_count"], 0.0)
+    target = np.minimum(target, cap)
+    # targets of the last startup_steps steps; a pod counts as ready once it has been scheduled that long
+    scheduled = np.tile(target, (startup_steps + 1, 1))
+    recommendations = np.full((window_rows, size), -np.inf)
+    recommended_at = np.full(window_rows, -np.inf)
+    # pods the HPA added and removed at each sync, for the policies' periods
+    added = np.zeros((event_rows, size))
+    removed = np.zeros((event_rows, size))
+    changed_at = np.full(event_rows, -np.inf)
+    last_active = np.zeros(size)
+
+    peak = backlog.copy()
+    peak_at = np.zeros(size)
+    drained_at = np.full(size, np.nan)
+    replica_seconds = np.zeros(size)
+    max_replicas = target.copy()
+    breach_at = np.full(size, np.nan)
+    ready_at_breach = np.zeros(size)
+    scaled_at = np.full(size, np.nan)
+    ready = target.copy()
+
+    for step, rate in enumerate(arrival_rates):
+        now = step * step_seconds
+        backlog += rate * step_seconds
+
+        # KEDA: activation and scale-to-zero happen on its own polling ticks
+        polled = step % poll_every == 0
+        above_activation = backlog > p["activation_lag_threshold"]
+        last_active = np.where(polled & above_activation, now, last_active)
+        target = np.where(polled & above_activation & (target == 0), 1.0, target)
+        idle_long_enough = now - last_active >= p["cooldown_period"]
+        target = np.where(polled & (p["min_replica_count"] == 0) & ~above_activation & idle_long_enough, 0.0, target)
+
+        # HPA: only acts while KEDA keeps the workload active
+        if step % sync_every == 0:
+            sync = step // sync_every
+            desired = np.clip(np.ceil(backlog / p["lag_threshold"]), floor, cap)
+            row = sync % window_rows
+            recommendations[row], recommended_at[row] = desired, now
+            age = (now - recommended_at)[:, None]
+            up_recommendation = np.where(age <= p["scale_up_stabilization_seconds"][None, :], recommendations, np.inf).min(axis=0)
+            down_recommendation = np.where(age <= p["scale_down_stabilization_seconds"][None, :], recommendations, -np.inf).max(axis=0)
+            stabilized = np.minimum(np.maximum(target, up_recommendation), down_recommendation)
+
+            # like the HPA, an event counts towards a period until periodSeconds after it
+            since = (now - changed_at)[:, None]
+            up_start = target - np.where(since < p["scale_up_period_seconds"][None, :], added, 0).sum(axis=0)
+            down_start = target + np.where(since < p["scale_down_period_seconds"][None, :], removed, 0).sum(axis=0)
+            up_limit = np.maximum(up_start + np.maximum(p["scale_up_pods"], np.ceil(up_start * p["scale_up_percent"] / 100)), target)
+            down_limit = np.minimum(down_start - np.floor(down_start * p["scale_down_percent"] / 100), target)
+            scaled = np.where(stabilized > target, np.minimum(stabilized, up_limit), np.maximum(stabilized, down_limit))
+            scaled = np.where(target > 0, np.clip(scaled, floor, cap), target)
+
+            row = sync % event_rows
+            added[row], removed[row], changed_at[row] = np.maximum(scaled - target, 0), np.maximum(target - scaled, 0), now
+            target = scaled
+
+        scheduled[step % (startup_steps + 1)] = target
+        ready = np.minimum(target, scheduled[(step + 1) % (startup_steps + 1)])
+
+        consumed = np.minimum(backlog, ready * per_pod_throughput * step_seconds)
+        backlog -= consumed
+
+        breached = np.isnan(breach_at) & (backlog > p["lag_threshold"] * np.maximum(ready, 1))
+        breach_at = np.where(breached, now, breach_at)
+        ready_at_breach = np.where(breached, ready, ready_at_breach)
+        scaled_at = np.where(~np.isnan(breach_at) & np.isnan(scaled_at) & (ready > ready_at_breach), now, scaled_at)
+
+        new_peak = backlog > peak
+        peak = np.where(new_peak, backlog, peak)
+        peak_at = np.where(new_peak, now, peak_at)
+        drained_at = np.where(new_peak, np.nan, drained_at)
+        drained_at = np.where(np.isnan(drained_at) & (backlog <= p["lag_threshold"]) & (now >= peak_at), now, drained_at)
+
+        replica_seconds += target * step_seconds
+        max_replicas = np.maximum(max_replicas, target)
+
+    return {
+        "backlog_peak": peak,
+        "time_to_drain": drained_at - peak_at,
+        "replica_minutes": replica_seconds / 60,
+        "scale_up_latency": scaled_at - breach_at,
+        "max_replicas": max_replicas,
+        "final_backlog": backlog,
+    }
+
+
+def rank(params: dict, results: dict, max_backlog: float = None, max_drain_seconds: float = None, top: int = 10) -> list:
+    """Cheapest combinations (fewest replica-minutes) that drain and meet the limits, best first."""
+    feasible = ~np.isnan(results["time_to_drain"])
+    if max_backlog is not None:
+        feasible &= results["backlog_peak"] <= max_backlog
+    if max_drain_seconds is not None:
+        feasible &= results["time_to_drain"] <= max_drain_seconds
+
+    candidates = np.flatnonzero(feasible)
+    order = np.lexsort((results["backlog_peak"][candidates], results["replica_minutes"][candidates]))
+
+    def as_number(value: float):
+        return None if np.isnan(value) else round(float(value), 2)
+
+    def as_parameter(value: float):
+        # whole numbers come back as ints, ready for DeploymentData; anything else is left as swept
+        value = float(value)
+        return int(value) if value.is_integer() else value
+
+    return [
+        {
+            "parameters": {name: as_parameter(params[name][index]) for name in SCALED_OBJECT_PARAMETERS},
+            **{metric: as_number(values[index]) for metric, values in results.items()}
+        }
+        for index in candidates[order][:top]
+    ]
+
+
+def recommend(ranked: list) -> dict:
+    """ScaledObject settings of the best ranked combination, named like the DeploymentData fields."""
+    return dict(ranked[0]["parameters"]) if ranked else None